@@ -0,0 +1,74 @@
+"""
+Tests for bootstrap confidence intervals on lick microstructure
+"""
+import numpy as np
+import pytest
+from trompy.lickcalc import Lickcalc
+from trompy.lick_bootstrap import bootstrap_lickcalc
+
+
+def make_licks():
+    rng = np.random.default_rng(7)
+    ilis = np.concatenate([rng.normal(0.15, 0.02, 1000), rng.exponential(10, 80)])
+    rng.shuffle(ilis)
+    return np.cumsum(np.abs(ilis))
+
+
+def test_estimates_match_lickcalc():
+    lc = Lickcalc(licks=make_licks())
+    output = bootstrap_lickcalc(lc, n_boot=200, seed=0)
+
+    assert output['burst_number']['estimate'] == lc.burst_number
+    assert output['burst_mean']['estimate'] == pytest.approx(lc.burst_mean)
+    # frequency from mean intraburst ILI
+    within = np.concatenate([np.diff(b) for b in lc.bursts])
+    assert output['intraburst_freq']['estimate'] == pytest.approx(1 / np.mean(within))
+
+
+def test_seed_is_reproducible():
+    licks = make_licks()
+    a = bootstrap_lickcalc(licks, n_boot=1500, seed=1)
+    b = bootstrap_lickcalc(licks, n_boot=1500, seed=1)
+    c = bootstrap_lickcalc(licks, n_boot=1500, seed=2)
+
+    np.testing.assert_array_equal(a['burst_mean']['replicates'], b['burst_mean']['replicates'])
+    assert not np.array_equal(a['burst_mean']['replicates'], c['burst_mean']['replicates'])
+    assert len(a['burst_mean']['replicates']) == 1500
+
+
+def test_parallel_matches_serial():
+    licks = make_licks()
+    serial = bootstrap_lickcalc(licks, n_boot=2500, method='blocks', seed=3)
+    parallel = bootstrap_lickcalc(licks, n_boot=2500, method='blocks', seed=3, n_jobs=2)
+
+    for stat in serial:
+        np.testing.assert_array_equal(serial[stat]['replicates'], parallel[stat]['replicates'])
+
+
+@pytest.mark.parametrize("method", ['bursts', 'blocks'])
+def test_ci_contains_estimate(method):
+    output = bootstrap_lickcalc(make_licks(), n_boot=1000, method=method, seed=4)
+
+    for stat in ['burst_mean', 'intraburst_freq']:
+        low, high = output[stat]['ci']
+        assert low < output[stat]['estimate'] < high
+
+    # burst number only varies when blocks of time are resampled
+    low, high = output['burst_number']['ci']
+    assert (low < high) == (method == 'blocks')
+
+
+def test_invalid_method():
+    with pytest.raises(ValueError):
+        bootstrap_lickcalc(make_licks(), n_boot=10, method='licks')
+
+
+def test_invalid_n_boot():
+    with pytest.raises(ValueError, match="n_boot"):
+        bootstrap_lickcalc(make_licks(), n_boot=0)
+
+
+@pytest.mark.parametrize("method", ['bursts', 'blocks'])
+def test_no_licks(method):
+    with pytest.raises(ValueError, match="No licks"):
+        bootstrap_lickcalc([], n_boot=10, method=method)
@@ -0,0 +1,40 @@
+"""
+Tests for cached filter designs
+"""
+import numpy as np
+import trompy as tp
+from trompy import filter_utils
+
+
+def test_designs_are_cached():
+    filter_utils._design_sos.cache_clear()
+    sos = tp.design_filter(4, 5, fs=100)
+    sos[0, 0] = 0 # changing a returned design does not change the cache
+    again = tp.design_filter(4, [5.0][0], fs=100.0)
+
+    assert filter_utils._design_sos.cache_info().hits == 1
+    assert again[0, 0] != 0
+
+
+def test_lowpass_removes_high_frequencies():
+    fs = 1000
+    t = np.arange(0, 10, 1/fs)
+    slow = np.sin(2*np.pi*1*t)
+    data = slow + np.sin(2*np.pi*100*t)
+
+    filtered = tp.filter_data(data, 10, fs=fs)
+    np.testing.assert_allclose(filtered[1000:-1000], slow[1000:-1000], atol=0.01)
+
+    # filters each row of 2D data, e.g. snips
+    filtered = tp.filter_data(np.vstack((data, data)), 10, fs=fs, axis=1)
+    assert filtered.shape == (2, len(t))
+
+
+def test_konanur_lowpass_option():
+    rng = np.random.default_rng(0)
+    blue = rng.normal(0, 1, 20000)
+    uv = rng.normal(0, 1, 20000)
+    processed = tp.processdata(blue, uv, method='konanur', normalize=False, lowpass=6)
+
+    # white noise difference is smoothed, so neighbouring samples are correlated
+    assert np.corrcoef(processed[:-1], processed[1:])[0, 1] > 0.9
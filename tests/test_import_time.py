@@ -0,0 +1,53 @@
+"""
+Guards against heavy dependencies creeping back into `import trompy`
+"""
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ['pandas', 'scipy.optimize', 'scipy.stats', 'matplotlib', 'numba']
+
+
+def run_in_fresh_interpreter(code):
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def test_import_does_not_load_heavy_modules():
+    loaded = run_in_fresh_interpreter(
+        "import sys, json, trompy\n"
+        "from trompy import lickcalc, Lickcalc\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    assert loaded == []
+
+
+def top_level_import_times(code):
+    """Cumulative import times (us) of the top-level imports reported by -X importtime"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) != 3 or fields[2].startswith('  ') or not fields[1].strip().isdigit():
+            continue
+        times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+def test_import_time():
+    # numpy dominates the import time of the numeric core, so compare with numpy alone;
+    # cumulative -X importtime numbers are used rather than wall-clock time and the bound
+    # is generous so that a busy machine does not fail the test
+    times = top_level_import_times("import numpy; import trompy; from trompy import Lickcalc")
+    trompy_time = sum(t for name, t in times.items() if name.split('.')[0] == 'trompy')
+    assert trompy_time < max(500_000, 2 * times['numpy'])
+
+
+def test_lickcalc_works_without_optional_imports():
+    loaded = run_in_fresh_interpreter(
+        "import sys, json\n"
+        "from trompy import Lickcalc\n"
+        "lc = Lickcalc(licks=[0.1, 0.25, 0.4, 0.55, 5.0, 5.1, 5.2, 5.35])\n"
+        "assert lc.burst_number == 2 and lc.intraburst_mode is not None\n"
+        "print(json.dumps('pandas' in sys.modules))")
+    assert loaded is False
@@ -0,0 +1,90 @@
+"""
+Parity tests for the compiled (loop) and NumPy lick segmentation kernels
+"""
+import numpy as np
+import pytest
+from trompy import _kernels
+
+
+def make_licks(seed):
+    rng = np.random.default_rng(seed)
+    ilis = np.concatenate([rng.normal(0.15, 0.05, 500), rng.exponential(2, 50)])
+    rng.shuffle(ilis)
+    return np.cumsum(np.abs(ilis))
+
+
+def loop_version(func):
+    # compiled kernels keep the original Python function, so parity holds with or without Numba
+    return getattr(func, 'py_func', func)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_segment_bounds_parity(seed):
+    licks = make_licks(seed)
+    for threshold in [0.5, 10]:
+        expected = _kernels._segment_bounds_numpy(licks, threshold)
+        result = loop_version(_kernels._segment_bounds_loop)(licks, threshold)
+        for e, r in zip(expected, result):
+            np.testing.assert_array_equal(e, r)
+
+    empty = loop_version(_kernels._segment_bounds_loop)(np.array([]), 0.5)
+    assert len(empty[0]) == len(empty[1]) == 0
+
+
+def test_segment_sums_parity():
+    values = np.random.default_rng(0).random(100)
+    starts = np.array([0, 10, 10, 50])
+    stops = np.array([10, 10, 60, 100])
+
+    expected = _kernels._segment_sums_numpy(values, starts, stops)
+    result = loop_version(_kernels._segment_sums_loop)(values, starts, stops)
+    np.testing.assert_allclose(expected, result)
+    assert expected[1] == 0
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_ilis_in_bursts_parity(seed):
+    diffs = np.diff(make_licks(seed))
+    expected = _kernels._ilis_in_bursts_numpy(diffs, 0.5)
+    result = loop_version(_kernels._ilis_in_bursts_loop)(diffs, 0.5)
+    for e, r in zip(expected, result):
+        np.testing.assert_array_equal(e, r)
+
+
+def test_backend_falls_back_to_numpy():
+    previous = _kernels.get_backend()
+    try:
+        _kernels.set_backend(None)
+        assert _kernels.get_backend() in ('numba', 'numpy')
+
+        _kernels.set_backend('numpy')
+        starts, stops = _kernels.segment_bounds(make_licks(0), 0.5)
+        assert starts[0] == 0 and stops[-1] == 550
+
+        with pytest.raises(ValueError):
+            _kernels.set_backend('cuda')
+    finally:
+        _kernels.set_backend(previous)
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_numba_backend_matches_numpy(seed):
+    pytest.importorskip("numba")
+    licks = make_licks(seed)
+    diffs = np.diff(licks)
+
+    previous = _kernels.get_backend()
+    try:
+        results = {}
+        for backend in ['numpy', 'numba']:
+            _kernels.set_backend(backend)
+            assert _kernels.get_backend() == backend
+            starts, stops = _kernels.segment_bounds(licks, 0.5)
+            results[backend] = (starts, stops,
+                                _kernels.segment_sums(diffs, starts, np.maximum(stops - 1, starts)),
+                                *_kernels.ilis_in_bursts(diffs, 0.5))
+    finally:
+        _kernels.set_backend(previous)
+
+    for expected, result in zip(results['numpy'], results['numba']):
+        np.testing.assert_allclose(expected, result)
@@ -0,0 +1,75 @@
+"""
+Tests for compact lickcalc result storage
+"""
+import numpy as np
+from trompy.lickcalc import Lickcalc
+from trompy.lick_utils import lickcalc
+from trompy.lick_results import LickcalcResult, LickcalcCohort
+
+
+def make_licks(seed):
+    rng = np.random.default_rng(seed)
+    ilis = np.concatenate([rng.normal(0.15, 0.02, 200), rng.exponential(5, 20)])
+    rng.shuffle(ilis)
+    return np.cumsum(np.abs(ilis))
+
+
+def test_result_round_trips_legacy_dict():
+    licks = make_licks(0)
+    legacy = lickcalc(licks)
+    result = LickcalcResult.from_dict(legacy)
+    converted = result.to_dict()
+
+    for key in ['bStart', 'bInd', 'bEnd', 'bLicks', 'bTime', 'rStart', 'rInd', 'rEnd', 'rLicks', 'rTime']:
+        np.testing.assert_allclose(converted[key], legacy[key])
+    for key in ['total', 'bNum', 'rNum', 'bMean', 'freq', 'weib_alpha']:
+        assert converted[key] == legacy[key]
+    np.testing.assert_allclose(converted['IBIs'], legacy['IBIs'])
+
+
+def test_result_from_lickcalc_uses_typed_arrays():
+    result = LickcalcResult.from_lickcalc(Lickcalc(licks=make_licks(1)))
+
+    assert result.burst_licks.dtype == np.int32
+    assert result.burst_start.dtype == np.float64
+    assert not hasattr(result, '__dict__')
+
+
+def test_cohort_save_and_load(tmp_path):
+    lickdata = [lickcalc(make_licks(seed)) for seed in range(5)]
+    cohort = LickcalcCohort(lickdata, names=[f"rat{i}" for i in range(5)])
+
+    path = tmp_path / "cohort.npz"
+    cohort.save(path)
+    loaded = LickcalcCohort.load(path)
+
+    assert len(loaded) == 5
+    assert loaded.names == cohort.names
+    np.testing.assert_allclose(loaded.get('total'), [d['total'] for d in lickdata])
+
+    for name, legacy in zip(loaded.names, lickdata):
+        result = loaded[name]
+        assert result.burst_licks.tolist() == legacy['bLicks']
+        np.testing.assert_allclose(result.runs_start, legacy['rStart'])
+        assert result.burst_mean == legacy['bMean']
+
+    # a loaded cohort can be saved again, including over its own file
+    loaded.save(path)
+    for a, b in zip(LickcalcCohort.load(path), cohort):
+        np.testing.assert_array_equal(a.burst_start, b.burst_start)
+        np.testing.assert_array_equal(a.runs_licks, b.runs_licks)
+
+
+def test_cohort_reads_arrays_on_demand(tmp_path):
+    lickdata = [lickcalc(make_licks(seed)) for seed in range(3)]
+    path = tmp_path / "cohort.npz"
+    LickcalcCohort(lickdata).save(path)
+
+    loaded = LickcalcCohort.load(path)
+    assert loaded._arrays == {}
+    np.testing.assert_allclose(loaded._array('burst_start'), np.concatenate([d['bStart'] for d in lickdata]))
+    assert list(loaded._arrays) == ['burst_start']
+
+    loaded.load_all()
+    path.unlink()
+    assert [result.burst_licks.tolist() for result in loaded] == [d['bLicks'] for d in lickdata]
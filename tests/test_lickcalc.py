@@ -4,6 +4,7 @@ import unittest
 import numpy as np
 np.random.seed(1234)
 from trompy import Lickcalc, lickcalc
+from trompy.lickcalc import calculate_burst_prob, calculate_burst_prob_batch
 
 def make_toy_data():
     import numpy as np
@@ -44,6 +45,28 @@ def test_runcalc():
     lc = Lickcalc(licks=licks)
     assert lc.runs_number == 4
 
+def test_run_inds_with_repeated_timestamps():
+    # a timestamp equal to a run start elsewhere in the train must not be counted as a run start
+    licks = np.array([1.0, 1.0, 1.2, 20.0, 20.0, 20.1])
+    lc = Lickcalc(licks=licks)
+
+    assert lc.runs_inds == [0, 3]
+    assert lc.runs_licks == [3, 3]
+    assert lc.runs_start == [1.0, 20.0]
+
+def test_runs_are_views_into_licks():
+    np.random.seed(1234)
+    licks = make_toy_data()
+    lc = Lickcalc(licks=licks, min_run_length=3)
+
+    assert len(lc.runs) == lc.runs_number
+    for run, start, nlicks in zip(lc.runs, lc.runs_start, lc.runs_licks):
+        assert np.shares_memory(run, lc.licks)
+        assert run[0] == start
+        assert len(run) == nlicks
+    for burst, nlicks in zip(lc.bursts, lc.burst_licks):
+        assert len(burst) == nlicks
+
 def test_longlicks():
     np.random.seed(1234)  # Set seed inside function for pytest compatibility
     licks = make_toy_data()
@@ -67,6 +90,89 @@ def test_time_divisions_weibull_none_when_not_fittable():
             assert division['weibull_beta'] is None
             assert division['weibull_rsq'] is None
 
+def test_time_divisions_match_segment_lickcalc():
+    np.random.seed(1234)
+    licks = make_toy_data()
+    result = lickcalc(licks, time_divisions=4)
+
+    assert sum(div['total_licks'] for div in result['time_divisions']) == len(licks)
+    for div in result['time_divisions']:
+        segment = [t for t in licks if div['start_time'] <= t <= div['end_time']]
+        if len(segment) > 1:
+            lc = Lickcalc(licks=segment)
+            assert div['n_bursts'] == lc.burst_number
+            assert div['mean_licks_per_burst'] == lc.burst_mean
+
+def test_sliding_time_windows():
+    licks = np.arange(0, 600, 0.5)
+    result = lickcalc(licks, window_length=300, window_step=60, session_length=600)
+    windows = result['time_windows']
+
+    assert len(windows) == 6
+    assert [w['start_time'] for w in windows] == [0, 60, 120, 180, 240, 300]
+    assert all(w['duration'] == 300 for w in windows)
+    assert all(w['total_licks'] == 600 for w in windows)
+    assert all(w['division_type'] == 'window' for w in windows)
+
+def test_rolling_matches_brute_force():
+    np.random.seed(1234)
+    licks = make_toy_data()
+    lc = Lickcalc(licks=licks)
+    window, step = 10, 0.5
+    out = lc.rolling(window, step)
+
+    assert len(out['time']) == int(np.floor(licks[-1] / step)) + 1
+    np.testing.assert_allclose(out['time'][:4], [0, 0.5, 1.0, 1.5])
+
+    burst_start = np.array(lc.burst_start)
+    burst_licks = np.array(lc.burst_licks)
+    for k in [0, 20, 50, 100, len(out['time']) - 1]:
+        left, right = out['time'][k] - window / 2, out['time'][k] + window / 2
+        in_window = (licks >= left) & (licks < right)
+        assert out['lick_rate'][k] == np.sum(in_window) / window
+
+        bursts = (burst_start >= left) & (burst_start < right)
+        assert out['burst_number'][k] == np.sum(bursts)
+        if np.sum(bursts) > 0:
+            np.testing.assert_allclose(out['burst_mean'][k], np.mean(burst_licks[bursts]))
+        else:
+            assert np.isnan(out['burst_mean'][k])
+
+def test_rolling_trailing_window_aligns_with_samples():
+    licks = np.array([1.0, 1.1, 1.2, 5.0])
+    fs = 10
+    out = Lickcalc(licks=licks).rolling(window=1, step=1/fs, center=False)
+
+    # grid point k is sample k of a stream sampled at fs
+    np.testing.assert_allclose(out['time'], np.arange(51) / fs)
+    # trailing windows include licks at their own grid point
+    assert out['lick_rate'][13] == 3
+    assert out['lick_rate'][50] == 1
+
+def test_burst_prob_matches_histogram():
+    bursts = [3, 1, 2, 5, 5, 2, 8, 1, 1]
+    hist = np.histogram(bursts, bins=np.arange(min(bursts), max(bursts)), density=True)
+
+    x, y = calculate_burst_prob(bursts)
+    np.testing.assert_array_equal(x, hist[1][1:])
+    np.testing.assert_allclose(y, 1 - np.cumsum(hist[0]))
+
+    # too few distinct sizes for a curve
+    x, y = calculate_burst_prob([2, 3])
+    assert len(x) == 0 and len(y) == 0
+
+def test_burst_prob_batch():
+    sessions = [[3, 1, 2, 5, 5, 2], [1, 1, 4, 10], [2, 2], []]
+    x, y, lengths = calculate_burst_prob_batch(sessions)
+
+    assert x.shape == y.shape == (4, 8)
+    assert lengths.tolist() == [3, 8, 0, 0]
+    for row, bursts in enumerate(sessions[:2]):
+        x_single, y_single = calculate_burst_prob(bursts)
+        np.testing.assert_array_equal(x[row, :lengths[row]], x_single)
+        np.testing.assert_allclose(y[row, :lengths[row]], y_single)
+        assert np.all(np.isnan(y[row, lengths[row]:]))
+
 if __name__ == "__main__":
     test_burstcalc()
     test_runcalc()
@@ -0,0 +1,47 @@
+"""
+Tests for calculating lick statistics on several subsets of licks at once
+"""
+import numpy as np
+import pytest
+from trompy.lickcalc import Lickcalc
+from trompy.lick_utils import lickcalc_subsets
+
+
+def make_licks():
+    rng = np.random.default_rng(42)
+    ilis = np.concatenate([rng.normal(0.15, 0.02, 300), rng.exponential(4, 40)])
+    rng.shuffle(ilis)
+    return np.cumsum(np.abs(ilis))
+
+
+def test_subsets_match_separate_lickcalc():
+    licks = make_licks()
+    rewarded = (licks % 60) < 20
+    table = lickcalc_subsets(licks, masks={'reward': rewarded, 'no reward': ~rewarded},
+                             minburstlength=2)
+
+    assert list(table['subset']) == ['reward', 'no reward']
+    for mask, (_, row) in zip([rewarded, ~rewarded], table.iterrows()):
+        lc = Lickcalc(licks=licks[mask], min_burst_length=2)
+        assert row['total_licks'] == lc.total
+        assert row['n_bursts'] == lc.burst_number
+        assert row['mean_licks_per_burst'] == pytest.approx(lc.burst_mean)
+        assert row['n_runs'] == lc.runs_number
+        assert row['intraburst_freq'] == pytest.approx(lc.intraburst_freq)
+        assert row['mean_ili'] == pytest.approx(np.mean(np.diff(licks[mask])))
+
+
+def test_subsets_from_labels():
+    licks = make_licks()
+    labels = np.where(np.arange(len(licks)) % 3 == 0, 'a', 'b')
+    table = lickcalc_subsets(licks, labels=labels)
+
+    assert list(table['subset']) == ['a', 'b']
+    assert table['total_licks'].sum() == len(licks)
+    lc = Lickcalc(licks=licks[labels == 'b'])
+    assert table['n_bursts'][1] == lc.burst_number
+
+
+def test_subsets_requires_masks_or_labels():
+    with pytest.raises(ValueError):
+        lickcalc_subsets([1, 2, 3])
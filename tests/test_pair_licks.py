@@ -0,0 +1,93 @@
+"""
+Tests for pairing lick onsets with offsets when TTLs have been dropped
+"""
+import warnings
+import numpy as np
+import pytest
+from trompy.lickcalc import Lickcalc, pair_licks
+from trompy.lick_utils import lickcalc
+
+
+def test_pair_licks_aligned():
+    """Well-formed data should pair one-to-one"""
+    licks = np.array([1.0, 2.0, 3.0])
+    offsets = licks + 0.1
+
+    pairs = pair_licks(licks, offsets)
+
+    np.testing.assert_allclose(pairs['offset'], offsets)
+    assert len(pairs['unmatched_licks']) == 0
+    assert len(pairs['unmatched_offsets']) == 0
+
+
+def test_pair_licks_missing_offset():
+    """A dropped offset should leave its onset unmatched without shifting later pairs"""
+    licks = np.array([1.0, 2.0, 3.0, 4.0])
+    offsets = np.array([1.1, 3.1, 4.1])  # offset for lick at 2.0 was dropped
+
+    pairs = pair_licks(licks, offsets)
+
+    assert np.isnan(pairs['offset'][1])
+    np.testing.assert_allclose(pairs['offset'][[0, 2, 3]], [1.1, 3.1, 4.1])
+    assert pairs['unmatched_licks'].tolist() == [1]
+    assert len(pairs['unmatched_offsets']) == 0
+
+
+def test_pair_licks_missing_onset():
+    """A dropped onset should leave its offset unmatched"""
+    licks = np.array([1.0, 3.0, 4.0])
+    offsets = np.array([1.1, 2.1, 3.1, 4.1])  # onset at 2.0 was dropped
+
+    pairs = pair_licks(licks, offsets)
+
+    np.testing.assert_allclose(pairs['offset'], [1.1, 3.1, 4.1])
+    assert pairs['unmatched_offsets'].tolist() == [1]
+
+
+@pytest.mark.filterwarnings("ignore:.*could not be paired")
+def test_lickcalc_pairs_unequal_arrays():
+    """Lickcalc should pair automatically when lengths differ instead of truncating"""
+    licks = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+    offsets = np.array([1.1, 2.1, 3.5, 5.1])  # offset for lick at 4.0 was dropped
+
+    with pytest.warns(UserWarning, match="could not be paired"):
+        lc = Lickcalc(licks=licks, offset=offsets, longlick_threshold=0.3)
+
+    np.testing.assert_allclose(lc.licklength, [0.1, 0.1, 0.5, 0.1])
+    np.testing.assert_allclose(lc.longlicks, [0.5])
+    assert lc.unmatched_licks.tolist() == [4.0]
+    assert lc.total == 5
+
+    # removing long licks should remove the lick at 3.0 only
+    lc = Lickcalc(licks=licks, offset=offsets, longlick_threshold=0.3, remove_longlicks=True)
+    assert lc.licks.tolist() == [1.0, 2.0, 4.0, 5.0]
+
+    result = lickcalc(licks, offset=offsets)
+    assert result['unmatched_licks'].tolist() == [4.0]
+
+
+def test_lickcalc_missing_last_offset_is_silent():
+    """A session ending mid-lick leaves the last onset unmatched without a warning"""
+    licks = np.array([1.0, 2.0, 3.0, 4.0])
+    offsets = np.array([1.1, 2.1, 3.1])
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        lc = Lickcalc(licks=licks, offset=offsets)
+    assert lc.unmatched_licks.tolist() == [4.0]
+    assert len(lc.unmatched_offsets) == 0
+
+
+@pytest.mark.filterwarnings("ignore:.*could not be paired")
+def test_lickcalc_pairs_misaligned_equal_lengths():
+    """A dropped onset plus a spurious offset keeps lengths equal but must still be paired"""
+    licks = np.array([1.0, 2.0, 4.0, 5.0])  # onset at 3.0 was dropped
+    offsets = np.array([1.1, 2.1, 3.1, 4.1])  # offset at 5.1 was missed, so 3.1 is spurious
+
+    lc = Lickcalc(licks=licks, offset=offsets)
+    np.testing.assert_allclose(lc.offset, [1.1, 2.1, 4.1, np.nan])
+    assert lc.unmatched_offsets.tolist() == [3.1]
+
+    # aligned arrays are still used as they are
+    lc = Lickcalc(licks=licks, offset=licks + 0.1)
+    assert lc.unmatched_offsets is None
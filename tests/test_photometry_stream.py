@@ -0,0 +1,69 @@
+"""
+Tests for chunk-by-chunk isosbestic correction
+"""
+import numpy as np
+import pytest
+import scipy.signal as sig
+import trompy as tp
+from trompy.photometry_stream import StreamingCorrector
+
+
+def make_streams(n_samples=20000):
+    rng = np.random.default_rng(3)
+    uv = 100 + np.cumsum(rng.normal(0, 0.05, n_samples))
+    blue = 1.5 * uv + 20 + rng.normal(0, 0.5, n_samples)
+    return blue, uv
+
+
+def test_final_chunk_matches_processdata():
+    blue, uv = make_streams()
+    corrector = StreamingCorrector(fs=100, normalize=False)
+    chunks = [corrector.process(b, u) for b, u in zip(np.array_split(blue, 7), np.array_split(uv, 7))]
+
+    expected = tp.processdata(blue, uv, method='lerner', normalize=False)
+    # after the last chunk the fit has seen every sample, as processdata does
+    np.testing.assert_allclose(chunks[-1], expected[-len(chunks[-1]):], rtol=1e-6, atol=1e-9)
+    assert sum(len(c) for c in chunks) == len(blue)
+
+
+def test_filter_state_carried_between_chunks():
+    blue, uv = make_streams()
+    corrector = StreamingCorrector(fs=100, lowpass=5, normalize=False)
+    split = [1000, 1, 5000, 14000]
+    edges = np.cumsum([0] + split)
+    for start, stop in zip(edges[:-1], edges[1:]):
+        corrector.process(blue[start:stop], uv[start:stop])
+
+    sos = sig.butter(4, 5, 'low', fs=100, output='sos')
+    zi = sig.sosfilt_zi(sos)
+    x = sig.sosfilt(sos, uv, zi=zi * uv[0])[0]
+    assert corrector.n == len(uv)
+    assert corrector.mean_x == pytest.approx(np.mean(x))
+
+
+def test_fit_precise_with_large_offset():
+    blue, uv = make_streams()
+    offset = 1e6
+    corrector = StreamingCorrector(fs=100, normalize=False)
+    for b, u in zip(np.array_split(blue + offset, 50), np.array_split(uv + offset, 50)):
+        corrector.process(b, u)
+
+    slope, intercept = np.polyfit(uv + offset, blue + offset, 1)
+    assert corrector.slope == pytest.approx(slope, rel=1e-9)
+    assert corrector.intercept == pytest.approx(intercept, rel=1e-9)
+
+
+def test_running_normalisation():
+    blue, uv = make_streams()
+    corrector = StreamingCorrector(fs=100)
+    output = np.concatenate([corrector.process(b, u) for b, u in
+                             zip(np.array_split(blue, 20), np.array_split(uv, 20))])
+
+    assert len(output) == len(blue)
+    assert not np.any(np.isnan(output))
+    assert abs(np.mean(output[-1000:])) < 1
+
+
+def test_mismatched_chunks():
+    with pytest.raises(ValueError):
+        StreamingCorrector(fs=100).process(np.ones(10), np.ones(9))
@@ -6,6 +6,7 @@ Created on Wed Mar 23 13:57:05 2022
 """
 import pytest
 import numpy as np
+import scipy.signal as sig
 import trompy as tp
 import matplotlib.pyplot as plt
 from test_helpers import (create_gcamp_kernel, create_data_stream, 
@@ -72,6 +73,105 @@ def test_konanur_normalization_preserves_scale_for_tiny_signals():
 
     assert np.std(processed) > 0.01
 
+def test_konanur_any_length_and_float32():
+    np.random.seed(0)
+    for n_samples in [12000, 12001, 12007]:  # even, odd and prime lengths
+        blue = np.random.normal(0, 1, n_samples)
+        uv = blue * 0.95 + np.random.normal(0, 0.2, n_samples)
+
+        processed = tp.processdata(blue, uv, method="konanur", fs=123.456)
+        processed32 = tp.processdata(blue, uv, method="konanur", fs=123.456, dtype=np.float32)
+
+        assert len(processed) == n_samples
+        assert processed32.dtype == np.float32
+        np.testing.assert_allclose(processed32, processed, atol=1e-3)
+
+@pytest.mark.parametrize("lowpass", [None, 6])
+def test_konanur_float32_peak_memory(lowpass):
+    import tracemalloc
+    rng = np.random.default_rng(0)
+    blue, uv = rng.normal(0, 1, 200000), rng.normal(0, 1, 200000)
+    blue32, uv32 = blue.astype(np.float32), uv.astype(np.float32)
+
+    peaks = []
+    for b, u, dtype in [(blue, uv, np.float64), (blue32, uv32, np.float32)]:
+        tracemalloc.start()
+        tp.processdata(b, u, fs=123.456, dtype=dtype, lowpass=lowpass)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    # no double precision copies of the recording are made
+    assert peaks[1] < 0.6 * peaks[0]
+
+def test_konanur_default_unchanged():
+    np.random.seed(0)
+    blue = np.random.normal(0, 1, 12000)
+    uv = blue * 0.95 + np.random.normal(0, 0.2, 12000)
+
+    # original konanur: FFT difference, detrend and an analog design passed to filtfilt
+    df = np.fft.irfft(np.fft.rfft(blue) - np.fft.rfft(uv))
+    b, a = sig.butter(9, 0.012, 'low', analog=True)
+    expected = sig.filtfilt(b, a, sig.detrend(df))
+
+    np.testing.assert_allclose(tp.processdata(blue, uv, normalize=False), expected, rtol=1e-8, atol=1e-30)
+
+def test_konanur_lowpass_frequency_response():
+    fs = 1017
+    t = np.arange(fs * 60) / fs
+    slow, fast = np.sin(2 * np.pi * 1 * t), np.sin(2 * np.pi * 50 * t)
+    uv = np.zeros(len(t))
+
+    processed = tp.processdata(slow + fast, uv, normalize=False, fs=fs, lowpass=6)
+    middle = slice(fs * 5, -fs * 5)
+    # 1 Hz passes almost unchanged (apart from detrending) and 50 Hz is removed
+    np.testing.assert_allclose(processed[middle], sig.detrend(slow)[middle], atol=0.01)
+
+    unfiltered = tp.processdata(slow + fast, uv, normalize=True, fs=fs)
+    assert np.corrcoef(unfiltered[middle], fast[middle])[0, 1] > 0.5
+
+def test_isosbestic_fit_options():
+    rng = np.random.default_rng(1)
+    n_samples = 60000
+    t = np.arange(n_samples)
+    uv = 100 * np.exp(-t / 50000) + rng.normal(0, 0.5, n_samples)
+    blue = 1.3 * uv + 40 + rng.normal(0, 0.5, n_samples)
+
+    slope, intercept = np.polyfit(uv, blue, 1)
+    expected = slope * uv + intercept
+    np.testing.assert_allclose(tp.isosbestic_fit(uv, blue), expected, rtol=1e-10)
+    np.testing.assert_allclose(tp.isosbestic_fit(uv, blue, decimate=20), expected, rtol=1e-3)
+
+    # relationship that changes over time (e.g. bleaching) is followed by windowed fits
+    blue_drift = (1 + t / n_samples) * uv + rng.normal(0, 0.5, n_samples)
+    single = tp.isosbestic_fit(uv, blue_drift, decimate=10)
+    windowed = tp.isosbestic_fit(uv, blue_drift, decimate=10, window=5000)
+    assert np.std(blue_drift - windowed) < np.std(blue_drift - single) / 2
+
+    processed = tp.processdata(blue_drift, uv, method='lerner', normalize=False, fs=100,
+                               fit_decimate=10, fit_window=50)
+    np.testing.assert_allclose(processed, 100 * (blue_drift - windowed) / windowed)
+
+def test_processdata_batch():
+    rng = np.random.default_rng(2)
+    uv = 100 + np.cumsum(rng.normal(0, 0.05, (3, 12000)), axis=1)
+    blue = 1.5 * uv + rng.normal(0, 0.5, (3, 12000))
+
+    expected = np.array([tp.processdata(b, u, method='lerner', fs=123.456) for b, u in zip(blue, uv)])
+    serial = tp.processdata_batch(blue, uv, method='lerner', fs=123.456)
+    np.testing.assert_allclose(serial, expected)
+
+    out = np.zeros_like(blue)
+    parallel = tp.processdata_batch(blue, uv, n_jobs=2, out=out, method='lerner', fs=123.456)
+    assert parallel is out
+    np.testing.assert_allclose(out, expected)
+
+    # recordings of different lengths
+    recordings = [blue[0, :5000], blue[1], blue[2, :8001]]
+    isos = [uv[0, :5000], uv[1], uv[2, :8001]]
+    processed = tp.processdata_batch(recordings, isos, n_jobs=2, fs=123.456)
+    assert [len(p) for p in processed] == [5000, 12000, 8001]
+    np.testing.assert_allclose(processed[2], tp.processdata(recordings[2], isos[2], fs=123.456))
+
 def future_test_process_data_with_drift():
     n_samples = 600000
     fs = 1017.324
@@ -0,0 +1,137 @@
+"""
+Tests for NaN-padded snips of different lengths
+"""
+import numpy as np
+import pytest
+import trompy as tp
+from trompy.ragged_snips import RaggedSnips
+
+
+def make_windows(n=40, seed=3):
+    rng = np.random.default_rng(seed)
+    data = rng.normal(size=20000).cumsum()
+    starts = rng.integers(0, 15000, n)
+    stops = starts + rng.integers(50, 3000, n)
+    return data, starts, stops
+
+
+def test_from_windows_matches_slices():
+    data, starts, stops = make_windows()
+    snips = RaggedSnips.from_windows(data, starts, stops)
+
+    assert len(snips) == len(starts)
+    for snip, start, stop in zip(snips, starts, stops):
+        np.testing.assert_array_equal(snip, data[start:stop])
+    np.testing.assert_array_equal(snips[3], data[starts[3]:stops[3]])
+    assert np.all(np.isnan(snips.values[~snips.mask]))
+
+
+def test_from_windows_clips_to_data():
+    data = np.arange(100, dtype=float)
+    snips = RaggedSnips.from_windows(data, [-5, 90], [10, 120])
+
+    np.testing.assert_array_equal(snips.lengths, [10, 10])
+    np.testing.assert_array_equal(snips[1], data[90:])
+
+
+def test_from_windows_memmap(tmp_path):
+    data, starts, stops = make_windows()
+    np.save(tmp_path / "data.npy", data.astype(np.float32))
+    stream = tp.load_stream(tmp_path / "data.npy")
+    snips = RaggedSnips.from_windows(stream, np.append(starts, 19990), np.append(stops, 20100))
+
+    for snip, start, stop in zip(snips, np.append(starts, 19990), np.append(stops, 20100)):
+        np.testing.assert_array_equal(snip, stream[start:stop])
+    assert snips.lengths[-1] == 10
+
+
+def test_from_list_round_trip():
+    data, starts, stops = make_windows(n=10)
+    snip_list = [data[start:stop] for start, stop in zip(starts, stops)]
+    snips = RaggedSnips.from_list(snip_list)
+
+    for a, b in zip(snips.to_object_array(), snip_list):
+        np.testing.assert_array_equal(a, b)
+
+
+@pytest.mark.parametrize("samples_per_bin", [10, 101.7, 7.3])
+def test_bin_matches_each_snip(samples_per_bin):
+    data, starts, stops = make_windows()
+    snips = RaggedSnips.from_windows(data, starts, stops)
+
+    binned = snips.bin(samples_per_bin)
+    for snip, expected in zip(binned, snips):
+        np.testing.assert_allclose(snip, tp.bin_snips(expected[np.newaxis, :], samples_per_bin=samples_per_bin)[0])
+    np.testing.assert_array_equal(binned.lengths, np.ceil(snips.lengths / samples_per_bin))
+
+
+def test_bin_nan_only_affects_own_bin():
+    snips = RaggedSnips.from_list([np.arange(20, dtype=float), np.arange(12, dtype=float)])
+    snips.values[0, 3] = np.nan
+    binned = snips.bin(5)
+
+    assert np.isnan(binned[0][0])
+    assert not np.any(np.isnan(binned[0][1:]))
+    assert not np.any(np.isnan(binned[1]))
+
+
+def test_adjust_baseline_and_zscore():
+    data, starts, stops = make_windows()
+    baseline = 30
+
+    adjusted = RaggedSnips.from_windows(data, starts, stops).adjust_baseline(baseline)
+    zscored = RaggedSnips.from_windows(data, starts, stops).zscore(baseline)
+    for adj, z, start, stop in zip(adjusted, zscored, starts, stops):
+        snip = data[start:stop]
+        np.testing.assert_allclose(adj, snip - snip[:baseline].mean())
+        np.testing.assert_allclose(z, (snip - snip[:baseline].mean()) / snip[:baseline].std())
+
+
+def test_truncate():
+    data, starts, stops = make_windows()
+    snips = RaggedSnips.from_windows(data, starts, stops)
+    truncated = snips.truncate(20, 15)
+
+    assert truncated.shape == (len(starts), 35)
+    for row, snip in zip(truncated, snips):
+        np.testing.assert_array_equal(row, np.concatenate([snip[:20], snip[-15:]]))
+
+
+def test_truncate_short_snips():
+    snips = RaggedSnips.from_list([np.arange(10.), np.arange(3.) + 100, np.arange(5.) + 200])
+    truncated = snips.truncate(2, 5)
+
+    np.testing.assert_array_equal(truncated[0], [0, 1, 5, 6, 7, 8, 9])
+    np.testing.assert_array_equal(truncated[1], [100, 101, np.nan, np.nan, np.nan, np.nan, 102])
+    np.testing.assert_array_equal(truncated[2], [200, 201, np.nan, np.nan, 202, 203, 204])
+
+
+def test_mean_over_available_snips():
+    snips = RaggedSnips.from_list([np.ones(4), 3 * np.ones(2)])
+
+    np.testing.assert_allclose(snips.mean(axis=0), [2, 2, 1, 1])
+    np.testing.assert_allclose(snips.mean(axis=1), [1, 3])
+    assert snips.mean() == pytest.approx(10 / 6)
+    np.testing.assert_allclose(snips.std(axis=0), [1, 1, 0, 0])
+
+
+def test_indexing_keeps_lengths():
+    data, starts, stops = make_windows()
+    snips = RaggedSnips.from_windows(data, starts, stops)
+    keep = np.arange(len(snips)) % 3 != 0
+    subset = snips[keep]
+
+    assert isinstance(subset, RaggedSnips)
+    np.testing.assert_array_equal(subset.lengths, snips.lengths[keep])
+    np.testing.assert_array_equal(subset[0], snips[1])
+
+
+def test_snipper_long_snips():
+    data, starts, stops = make_windows()
+    fs = 10
+    snipper = tp.Snipper(data, list(starts / fs), end=list(stops / fs), fs=fs, pre=5, post=2,
+                         adjustbaseline=False)
+
+    assert isinstance(snipper.snips, RaggedSnips)
+    for snip, start, stop in zip(snipper.snips, starts, stops):
+        np.testing.assert_allclose(snip, data[max(start - 50, 0) : stop + 20], atol=1e-12)
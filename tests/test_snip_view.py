@@ -0,0 +1,67 @@
+"""
+Tests for read-only snip views
+"""
+import numpy as np
+import pytest
+import trompy as tp
+from trompy.snip_view import SnipView
+
+
+def make_view(chunk_size=7):
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=20000)
+    starts = np.sort(rng.integers(0, 19000, 100))
+    return data, starts, SnipView(data, starts, 500, chunk_size=chunk_size)
+
+
+def test_matches_copied_snips():
+    data = np.random.default_rng(0).random(10000)
+    events = np.arange(20, 980, 0.5)
+    copied, _ = tp.snipper(data, events, fs=10, adjust_baseline=False)
+    view, _ = tp.snipper(data, events, fs=10, adjust_baseline=False, view=True)
+
+    assert isinstance(view, SnipView)
+    assert view.shape == copied.shape
+    np.testing.assert_array_equal(np.asarray(view), copied)
+    np.testing.assert_array_equal(view[3], copied[3])
+
+
+def test_no_copy_until_needed():
+    data, starts, view = make_view()
+
+    assert np.shares_memory(view[0], data)
+    with pytest.raises(ValueError):
+        view[0][0] = 1
+
+    copied = view.copy()
+    copied[0, 0] = 1
+    assert data[starts[0]] != 1
+
+
+@pytest.mark.parametrize("axis", [None, 0, 1])
+def test_chunked_reductions(axis):
+    _, _, view = make_view()
+    snips = view.copy()
+
+    np.testing.assert_allclose(view.sum(axis=axis), snips.sum(axis=axis))
+    np.testing.assert_allclose(np.mean(view, axis=axis), snips.mean(axis=axis))
+    np.testing.assert_allclose(np.std(view, axis=axis, ddof=1), snips.std(axis=axis, ddof=1))
+
+
+def test_indexing():
+    _, starts, view = make_view()
+    snips = view.copy()
+
+    mask = starts > 10000
+    assert isinstance(view[mask], SnipView)
+    np.testing.assert_array_equal(view[mask].copy(), snips[mask])
+    np.testing.assert_array_equal(view[2:5, 100:200], snips[2:5, 100:200])
+    np.testing.assert_array_equal(view[4, 10], snips[4, 10])
+
+
+def test_view_requires_unmodified_snips():
+    data = np.random.random(10000)
+    with pytest.raises(ValueError):
+        tp.snipper(data, [100, 200], fs=10, view=True)
+    with pytest.raises(ValueError):
+        tp.snipper(data, [100, 200], fs=10, adjust_baseline=False, bins=30, view=True)
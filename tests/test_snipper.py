@@ -121,6 +121,124 @@ def test_diff_baselines():
     
     # add check to see what happens if incorrect number of values given for baseline or if trial length is too short
 
+def test_windows_match_slices():
+    data = np.random.random(5000)
+    events = np.arange(1, 480, 0.25)  # many overlapping events, e.g. every lick
+    output, _ = tp.snipper(data, events, fs=10, baseline_length=5, trial_length=15, adjust_baseline=False)
+
+    starts = [int(np.ceil(e*10)) - 50 for e in events if int(np.ceil(e*10)) - 50 > 0 and int(np.ceil(e*10)) + 100 < 5000]
+    assert len(output) == len(starts)
+    for snip, start in zip(output, starts):
+        np.testing.assert_array_equal(snip, data[start:start+150])
+
+    assert np.shape(tp.get_windows(data, [], 150)) == (0, 150)
+
+def test_zscore():
+    snips = np.random.random((20, 300))
+    snips[4, :100] = 1.0 # flat baseline
+    z = tp.zscore(snips, baseline_points=100)
+
+    expected = (snips[0] - np.mean(snips[0][:100])) / np.std(snips[0][:100])
+    np.testing.assert_allclose(z[0], expected)
+    assert np.all(np.isnan(z[4])) # zero SD gives NaN rather than inf
+    assert not np.any(np.isinf(z))
+
+    ragged = [np.random.random(n) for n in [150, 200, 250]]
+    z = tp.zscore(ragged, baseline_points=100)
+    assert [len(snip) for snip in z] == [150, 200, 250]
+    for snip, raw in zip(z, ragged):
+        np.testing.assert_allclose(snip, (raw - np.mean(raw[:100])) / np.std(raw[:100]))
+
+def test_memmap_input(tmp_path):
+    data = np.random.random(20000).astype(np.float32)
+    events = [100, 500, 1200, 1900]
+    expected, _ = tp.snipper(data, events, fs=10)
+
+    np.save(tmp_path / "data.npy", data)
+    output, _ = tp.snipper(tmp_path / "data.npy", events, fs=10)
+    np.testing.assert_array_equal(output, expected)
+
+    data.tofile(tmp_path / "data.bin")
+    output, _ = tp.snipper(str(tmp_path / "data.bin"), events, fs=10, dtype="float32")
+    np.testing.assert_array_equal(output, expected)
+
+    with pytest.raises(ValueError):
+        tp.snipper(tmp_path / "data.bin", events, fs=10)
+
+def test_findnoise_cache(monkeypatch):
+    data = np.random.random(100000)
+    events = tp.makerandomevents(120, 880)
+    bgMAD = tp.findnoise(data, events, fs=100, method='sum')
+
+    calls = []
+    snipper = tp.snipper_utils.snipper
+    def counting_snipper(*args, **kwargs):
+        calls.append(1)
+        return snipper(*args, **kwargs)
+    monkeypatch.setattr(tp.snipper_utils, 'snipper', counting_snipper)
+
+    assert tp.findnoise(data, events, fs=100, method='sum') == bgMAD
+    assert calls == [] # reused from first call
+
+    tp.findnoise(data, events, fs=100, method='sd')
+    tp.findnoise(data.copy(), events, fs=100, method='sum')
+    tp.clear_background_cache()
+    assert tp.findnoise(data, events, fs=100, method='sum') == bgMAD
+    assert len(calls) == 3
+
+def test_mastersnipper_streams_aligned():
+    data = np.random.random(100000)
+    events = [150, 300.5, 450, 990]
+    output = tp.mastersnipper(data, data + 1, data, 100, events, verbose=False)
+
+    expected, _ = tp.snipper(data, events, fs=100, bins=300)
+    np.testing.assert_allclose(output['blue'], expected)
+    np.testing.assert_allclose(output['uv'], expected)
+    assert np.shape(output['filt']) == (3, 300)
+
+def test_event_latencies():
+    events = [10, 20, 30, 40]
+    targets = [35, 12, 8, 19.5, 21]
+
+    np.testing.assert_allclose(tp.event_latencies(events, targets, direction='pre'),
+                               [-2, -0.5, -9, -5])
+    np.testing.assert_allclose(tp.event_latencies(events, targets, direction='post'),
+                               [2, 1, 5, np.nan])
+    np.testing.assert_allclose(tp.event_latencies(events, targets, direction='pre', max_latency=5),
+                               [-2, -0.5, np.nan, np.nan])
+    np.testing.assert_allclose(tp.event_latencies([8], targets, direction='pre'), [np.nan])
+
+    with pytest.raises(ValueError):
+        tp.event_latencies(events, targets, direction='both')
+
+def test_bin_snips_fractional_edges():
+    snips = np.arange(40, dtype=float).reshape(2, 20)
+
+    # whole number of samples per bin is the same as reshaping
+    np.testing.assert_allclose(tp.bin_snips(snips, bins=4), snips.reshape(2, 4, 5).mean(axis=2))
+
+    # 2.5 samples per bin gives edges at 0, 2, 5, 7, 10... so no samples are dropped
+    binned = tp.bin_snips(snips, samples_per_bin=2.5, method='sum')
+    assert binned.shape == (2, 8)
+    np.testing.assert_allclose(binned[0, :3], [0 + 1, 2 + 3 + 4, 5 + 6])
+    np.testing.assert_allclose(binned.sum(axis=1), snips.sum(axis=1))
+    np.testing.assert_allclose(tp.bin_snips(snips, samples_per_bin=2.5, method='max')[1, :2], [21, 24])
+
+    # last bin is partial when samples_per_bin does not divide snip length
+    partial = tp.bin_snips(snips, samples_per_bin=6)
+    np.testing.assert_allclose(partial[0], [2.5, 8.5, 14.5, 18.5])
+
+    with pytest.raises(ValueError):
+        tp.bin_snips(snips, bins=4, samples_per_bin=5)
+    with pytest.raises(ValueError):
+        tp.bin_snips(snips, bins=4, method='median')
+
+def test_resample_snips_uneven():
+    snips = [np.arange(30, dtype=float), np.ones(30)]
+    output = tp.resample_snips(snips, factor=0.25)
+
+    assert len(output) == 2 and len(output[0]) == 7
+    np.testing.assert_allclose(output[1], np.ones(7))
 
 # TODO: check with varied fs
 
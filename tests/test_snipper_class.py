@@ -136,6 +136,116 @@ def test_diff_baselines():
     # add check to see what happens if incorrect number of values given for baseline or if trial length is too short
 
 
+def test_zscore_long_snips():
+    data = np.random.random(10000)
+    start = [100, 400, 700]
+    end = [150, 420, 800]
+
+    snipper = tp.Snipper(data, start, end=end, fs=10, pre=10, post=10, adjustbaseline=False,
+                         baselinelength=10, binlength=0.5, zscore=True)
+
+    assert [len(snip) for snip in snipper.snips] == [140, 80, 240]
+    for snip in snipper.snips:
+        np.testing.assert_allclose(np.mean(snip[:20]), 0.0, atol=1e-10)
+        np.testing.assert_allclose(np.std(snip[:20]), 1.0)
+
+def test_memmap_input(tmp_path):
+    data = np.random.random(20000)
+    events = [100, 500, 1200, 1900]
+    np.save(tmp_path / "data.npy", data)
+
+    snipper = tp.Snipper(tmp_path / "data.npy", events, fs=10, binlength=0.5)
+    assert isinstance(snipper.data, np.memmap)
+    np.testing.assert_array_equal(snipper.snips, tp.Snipper(data, events, fs=10, binlength=0.5).snips)
+
+def test_artifacts_with_lowpass():
+    data = np.random.random(100000)
+    data[50500] = 100 # single-sample artifact in second snip
+    snipper = tp.Snipper(data, [200, 500, 800], fs=100, pre=10, post=20)
+
+    snipper.find_potential_artifacts(method="absolute_diff", threshold=5, lowpass=10, remove=False)
+    assert list(snipper.noiseindex) == [False, True, False]
+
+def test_artifacts_with_lowpass_long_snips():
+    data = np.random.random(100000)
+    data[51000] = 100 # single-sample artifact in second snip
+    snipper = tp.Snipper(data, [200, 500, 800], end=[300, 520, 900], fs=100, pre=10, post=10)
+
+    snipper.find_potential_artifacts(method="absolute_diff", threshold=5, lowpass=10, remove=False)
+    assert list(snipper.noiseindex) == [False, True, False]
+
+def test_artifacts_background_cached(monkeypatch):
+    import trompy.snipper_class as snipper_class
+    data = np.random.random(100000)
+    snipper = tp.Snipper(data, [200, 500, 800], fs=100, pre=10, post=20)
+
+    calls = []
+    makerandomevents = snipper_class.makerandomevents
+    monkeypatch.setattr(snipper_class, "makerandomevents", lambda *args: calls.append(args) or makerandomevents(*args))
+
+    # same as calculating each statistic for background and event snips separately
+    randomsnips = tp.Snipper(data, makerandomevents(120, 880), fs=100, pre=10, post=20, adjustbaseline=False).snips
+    stats = {"sum": lambda snip: np.sum(np.abs(snip)), "sd": np.std, "diff": lambda snip: np.max(np.abs(np.diff(snip)))}
+    for method, stat in stats.items():
+        bgMAD = tp.med_abs_dev([stat(snip) for snip in randomsnips])
+        for threshold in [0.1, 1, 10, 100]:
+            snipper.find_potential_artifacts(method=method, threshold=threshold, remove=False)
+            assert snipper.bgMAD == pytest.approx(bgMAD)
+            assert list(snipper.noiseindex) == [stat(snip) > bgMAD * threshold for snip in snipper.snips]
+    assert len(calls) == 1
+
+    with pytest.raises(ValueError):
+        snipper.find_potential_artifacts(method="max")
+
+def test_save_and_load(tmp_path):
+    data = np.random.random(100000)
+    events = [200, 500, 800]
+    snipper = tp.Snipper(data, events, fs=100, pre=10, post=20, binlength=0.1, baselinelength=[10, 5])
+    snipper.find_potential_artifacts(method="sd", remove=False)
+    snipper.save(tmp_path / "snips")
+
+    loaded = tp.Snipper.load(tmp_path / "snips")
+    assert isinstance(loaded.snips, np.memmap)
+    np.testing.assert_array_equal(loaded.snips, snipper.snips)
+    np.testing.assert_array_equal(loaded.noiseindex, snipper.noiseindex)
+    np.testing.assert_array_equal(loaded.start, events)
+    assert loaded.fs == 100 and loaded.binlength == 0.1 and loaded.binned
+    assert loaded.baselinelength == [10, 5]
+    assert loaded.baseline_end_in_samples == snipper.baseline_end_in_samples
+    assert loaded.data is None
+
+    # data can be given again to re-snip
+    loaded = tp.Snipper.load(tmp_path / "snips", data=data, mmap_mode=None)
+    loaded.binlength = 0.5
+    assert np.shape(loaded.get_snips()) == (3, 60)
+
+def test_save_and_load_long_snips(tmp_path):
+    data = np.random.random(10000)
+    snipper = tp.Snipper(data, [100, 400, 700], end=[150, 420, 800], fs=10, pre=10, post=10, binlength=0.5)
+    snipper.save(tmp_path)
+
+    loaded = tp.Snipper.load(tmp_path)
+    assert [len(snip) for snip in loaded.snips] == [len(snip) for snip in snipper.snips]
+    for a, b in zip(loaded.snips, snipper.snips):
+        np.testing.assert_array_equal(a, b)
+    np.testing.assert_array_equal(loaded.end, [150, 420, 800])
+
+def test_load_long_snips_then_zscore(tmp_path):
+    data = np.random.random(10000)
+    snipper = tp.Snipper(data, [100, 400, 700], end=[140, 490, 850], fs=10, pre=10, post=10)
+    snipper.save(tmp_path)
+
+    loaded = tp.Snipper.load(tmp_path)
+    loaded.adjust_baseline()
+    loaded.zscore_snips()
+    for snip in loaded.snips:
+        np.testing.assert_allclose(np.mean(snip[:100]), 0.0, atol=1e-10)
+        np.testing.assert_allclose(np.std(snip[:100]), 1.0)
+
+    # saved files are unchanged
+    for a, b in zip(tp.Snipper.load(tmp_path).snips, snipper.snips):
+        np.testing.assert_array_equal(a, b)
+
 # TODO: check with varied fs
 
 if __name__ == "__main__":
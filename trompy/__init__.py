@@ -8,8 +8,11 @@ __all__ = [
 	"medfilereader_arrays",
 	"metafilereader",
 	"processdata",
+	"processdata_batch",
 	"snipper",
 	"mastersnipper",
+	"SnipView",
+	"RaggedSnips",
 	"zscore",
 	"findnoise",
 	"removenoise",
@@ -18,6 +21,15 @@ __all__ = [
 	"time2samples",
 	"event2sample",
 	"resample_snips",
+	"bin_snips",
+	"get_windows",
+	"load_stream",
+	"clear_background_cache",
+	"event_latencies",
+	"StreamingCorrector",
+	"design_filter",
+	"filter_data",
+	"isosbestic_fit",
 	"remcheck",
 	"random_array",
 	"getuserhome",
@@ -29,6 +41,8 @@ __all__ = [
 	"download_data",
 	"lickcalc",
 	"lickCalc",
+	"lickcalc_subsets",
+	"bootstrap_lickcalc",
 	"sidakcorr",
 	"mean_and_sem",
 	"bonferroni_corrected_ttest",
@@ -62,6 +76,11 @@ __all__ = [
 	"Lickcalc",
 	"weib_davis",
 	"fit_weibull",
+	"pair_licks",
+	"calculate_burst_prob",
+	"calculate_burst_prob_batch",
+	"LickcalcResult",
+	"LickcalcCohort",
 	"Snipper",
 ]
 
@@ -82,6 +101,7 @@ _import_map = {
 	"medfilereader_arrays": "trompy.medfilereader",
 	"metafilereader": "trompy.metafile_utils",
 	"processdata": "trompy.snipper_utils",
+	"processdata_batch": "trompy.snipper_utils",
 	"snipper": "trompy.snipper_utils",
 	"mastersnipper": "trompy.snipper_utils",
 	"zscore": "trompy.snipper_utils",
@@ -92,6 +112,13 @@ _import_map = {
 	"time2samples": "trompy.snipper_utils",
 	"event2sample": "trompy.snipper_utils",
 	"resample_snips": "trompy.snipper_utils",
+	"bin_snips": "trompy.snipper_utils",
+	"get_windows": "trompy.snipper_utils",
+	"load_stream": "trompy.snipper_utils",
+	"clear_background_cache": "trompy.snipper_utils",
+	"event_latencies": "trompy.snipper_utils",
+	"SnipView": "trompy.snip_view",
+	"RaggedSnips": "trompy.ragged_snips",
 	"remcheck": "trompy.general_utils",
 	"random_array": "trompy.general_utils",
 	"getuserhome": "trompy.general_utils",
@@ -103,6 +130,7 @@ _import_map = {
 	"download_data": "trompy.general_utils",
 	"lickcalc": "trompy.lick_utils",
 	"lickCalc": "trompy.lick_utils",
+	"lickcalc_subsets": "trompy.lick_utils",
 	"sidakcorr": "trompy.stats_utils",
 	"mean_and_sem": "trompy.stats_utils",
 	"bonferroni_corrected_ttest": "trompy.stats_utils",
@@ -136,7 +164,17 @@ _import_map = {
 	"Lickcalc": "trompy.lickcalc",
 	"weib_davis": "trompy.lickcalc",
 	"fit_weibull": "trompy.lickcalc",
+	"pair_licks": "trompy.lickcalc",
+	"calculate_burst_prob": "trompy.lickcalc",
+	"calculate_burst_prob_batch": "trompy.lickcalc",
+	"LickcalcResult": "trompy.lick_results",
+	"LickcalcCohort": "trompy.lick_results",
+	"bootstrap_lickcalc": "trompy.lick_bootstrap",
 	"Snipper": "trompy.snipper_class",
+	"StreamingCorrector": "trompy.photometry_stream",
+	"design_filter": "trompy.filter_utils",
+	"filter_data": "trompy.filter_utils",
+	"isosbestic_fit": "trompy.snipper_utils",
 }
 
 import importlib
@@ -0,0 +1,190 @@
+"""
+Kernels for lick segmentation and per-segment reductions used by Lickcalc and lick_utils.
+
+Each kernel has a NumPy implementation and an equivalent loop implementation. If Numba
+is installed the loop implementations are compiled on first use, which avoids the
+temporary arrays of the NumPy versions on very long recordings. Otherwise, or if the
+backend is set to 'numpy', the NumPy implementations are used. Numba is only imported
+when a kernel is first called so that importing trompy stays fast.
+"""
+import os
+import numpy as np
+
+_backend = None
+_compiled = {}
+
+
+def get_backend():
+    """Returns the kernel backend in use, either 'numba' or 'numpy'."""
+    global _backend
+    if _backend is None:
+        _backend = 'numpy'
+        if not os.environ.get('TROMPY_DISABLE_NUMBA'):
+            try:
+                import numba  # noqa: F401
+                _backend = 'numba'
+            except ImportError:
+                pass
+    return _backend
+
+
+def set_backend(backend):
+    """
+    Sets the kernel backend.
+
+    Parameters
+    ----------
+    backend : Str
+        'numba' to use compiled kernels (raises ImportError if Numba is not installed),
+        'numpy' to use the pure NumPy path, or None to choose automatically.
+
+    """
+    global _backend
+    if backend == 'numba':
+        import numba  # noqa: F401
+    elif backend not in ('numpy', None):
+        raise ValueError(f"{backend} is not a valid backend. Use 'numba', 'numpy' or None.")
+    _backend = backend
+
+
+def _get_compiled(func):
+    if func not in _compiled:
+        import numba
+        _compiled[func] = numba.njit(cache=True)(func)
+    return _compiled[func]
+
+
+def _dispatch(loop_func, numpy_func, *args):
+    if get_backend() == 'numba':
+        return _get_compiled(loop_func)(*args)
+    return numpy_func(*args)
+
+
+## Segment boundaries, e.g. bursts or runs
+
+def _segment_bounds_numpy(licks, threshold):
+    if len(licks) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty.copy()
+
+    breaks = np.flatnonzero(np.diff(licks) > threshold) + 1
+    starts = np.concatenate((np.zeros(1, dtype=np.int64), breaks))
+    stops = np.concatenate((breaks, np.full(1, len(licks), dtype=np.int64)))
+    return starts, stops
+
+
+def _segment_bounds_loop(licks, threshold):
+    n = len(licks)
+    starts = np.zeros(n, dtype=np.int64)
+    stops = np.zeros(n, dtype=np.int64)
+    if n == 0:
+        return starts, stops
+
+    n_segments = 1
+    for i in range(1, n):
+        if licks[i] - licks[i - 1] > threshold:
+            stops[n_segments - 1] = i
+            starts[n_segments] = i
+            n_segments += 1
+    stops[n_segments - 1] = n
+    return starts[:n_segments], stops[:n_segments]
+
+
+def segment_bounds(licks, threshold):
+    """Start and stop (exclusive) indices of segments separated by intervals > threshold."""
+    return _dispatch(_segment_bounds_loop, _segment_bounds_numpy,
+                     np.ascontiguousarray(licks, dtype=np.float64), float(threshold))
+
+
+## Per-segment reductions
+
+def _segment_sums_numpy(values, starts, stops):
+    cumsum = np.concatenate((np.zeros(1), np.cumsum(values)))
+    return cumsum[stops] - cumsum[starts]
+
+
+def _segment_sums_loop(values, starts, stops):
+    # prefix sum so each segment costs one subtraction however long it is, e.g. for
+    # long overlapping windows in Lickcalc.rolling
+    cumsum = np.zeros(len(values) + 1)
+    for j in range(len(values)):
+        cumsum[j + 1] = cumsum[j] + values[j]
+    sums = np.zeros(len(starts))
+    for i in range(len(starts)):
+        sums[i] = cumsum[stops[i]] - cumsum[starts[i]]
+    return sums
+
+
+def segment_sums(values, starts, stops):
+    """Sum of values[starts[i]:stops[i]] for each segment i."""
+    return _dispatch(_segment_sums_loop, _segment_sums_numpy,
+                     np.ascontiguousarray(values, dtype=np.float64),
+                     np.ascontiguousarray(starts, dtype=np.int64),
+                     np.ascontiguousarray(stops, dtype=np.int64))
+
+
+## Interlick intervals within bursts
+
+def _ilis_in_bursts_numpy(diffs, threshold):
+    is_long = ~(diffs < threshold)
+    long_inds = np.flatnonzero(is_long)
+    short_inds = np.flatnonzero(~is_long)
+
+    # number of long intervals before each short interval is the index of its burst
+    burst_index = np.searchsorted(long_inds, short_inds)
+
+    # sentinel of -1 points at a trailing NaN for bursts at the start or end of the session
+    padded_long = np.concatenate(([-1], long_inds, [-1]))
+    padded_diffs = np.append(diffs, np.nan)
+    prev_long = padded_long[burst_index]
+    next_long = padded_long[burst_index + 1]
+
+    return (burst_index.astype(np.int64), (short_inds - prev_long - 1).astype(np.int64),
+            diffs[short_inds], padded_diffs[prev_long], padded_diffs[next_long])
+
+
+def _ilis_in_bursts_loop(diffs, threshold):
+    n = len(diffs)
+    burst_index = np.zeros(n, dtype=np.int64)
+    ili_index = np.zeros(n, dtype=np.int64)
+    ili = np.zeros(n)
+    pre_ili = np.zeros(n)
+    post_ili = np.zeros(n)
+
+    n_rows = 0
+    burst = 0
+    burst_first_row = 0
+    position = 0
+    pre = np.nan
+    for i in range(n):
+        if diffs[i] < threshold:
+            burst_index[n_rows] = burst
+            ili_index[n_rows] = position
+            ili[n_rows] = diffs[i]
+            pre_ili[n_rows] = pre
+            n_rows += 1
+            position += 1
+        else:
+            for row in range(burst_first_row, n_rows):
+                post_ili[row] = diffs[i]
+            burst += 1
+            burst_first_row = n_rows
+            position = 0
+            pre = diffs[i]
+    for row in range(burst_first_row, n_rows):
+        post_ili[row] = np.nan
+
+    return (burst_index[:n_rows], ili_index[:n_rows], ili[:n_rows],
+            pre_ili[:n_rows], post_ili[:n_rows])
+
+
+def ilis_in_bursts(diffs, threshold):
+    """
+    Labels each interlick interval below threshold with its burst and position.
+
+    Returns burst index, index of interval within burst, the interval, and the long
+    intervals immediately before (pre) and after (post) the burst (NaN at the start
+    or end of the session).
+    """
+    return _dispatch(_ilis_in_bursts_loop, _ilis_in_bursts_numpy,
+                     np.ascontiguousarray(diffs, dtype=np.float64), float(threshold))
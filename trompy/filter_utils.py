@@ -0,0 +1,91 @@
+"""
+Cached Butterworth filter designs applied as second-order sections.
+"""
+from functools import lru_cache
+import numpy as np
+import scipy.signal as sig
+
+
+@lru_cache(maxsize=128)
+def _design_sos(order, cutoff, fs, btype):
+    sos = sig.butter(order, cutoff, btype, fs=fs, output='sos')
+    sos.flags.writeable = False
+    return sos
+
+@lru_cache(maxsize=16)
+def _design_ba(order, cutoff, btype, analog):
+    b, a = sig.butter(order, cutoff, btype, analog=analog)
+    b.flags.writeable = a.flags.writeable = False
+    return b, a
+
+def design_filter(order, cutoff, fs=None, btype='low'):
+    """
+    Designs a digital Butterworth filter as second-order sections.
+
+    Designs are cached, so repeated calls with the same arguments (e.g. when
+    processing many recordings) return a copy of the stored design instead of
+    designing the filter again.
+
+    Parameters
+    ----------
+    order : Int
+        Filter order.
+    cutoff : Float or List of two Floats
+        Cutoff frequency, or [low, high] for 'bandpass' and 'bandstop'. In Hz if fs is
+        given, otherwise as a fraction of the Nyquist frequency.
+    fs : Float, optional
+        Sampling frequency. The default is None.
+    btype : Str, optional
+        'low', 'high', 'bandpass' or 'bandstop'. The default is 'low'.
+
+    Returns
+    -------
+    sos : 2D array
+        Second-order sections for use with scipy.signal.sosfilt or sosfiltfilt.
+
+    """
+    if np.ndim(cutoff) > 0:
+        cutoff = tuple(float(c) for c in cutoff)
+    else:
+        cutoff = float(cutoff)
+    # scipy's filters need a writeable array, and copying keeps the cached design intact
+    return _design_sos(int(order), cutoff, None if fs is None else float(fs), btype).copy()
+
+def filter_data(data, cutoff, fs=None, order=4, btype='low', zero_phase=True, axis=-1):
+    """
+    Filters data with a cached Butterworth design.
+
+    Parameters
+    ----------
+    data : List or array of Floats
+        Data to be filtered, e.g. a data stream or 2D array of snips.
+    cutoff : Float or List of two Floats
+        Cutoff frequency. See design_filter.
+    fs : Float, optional
+        Sampling frequency. The default is None.
+    order : Int, optional
+        Filter order. The default is 4.
+    btype : Str, optional
+        'low', 'high', 'bandpass' or 'bandstop'. The default is 'low'.
+    zero_phase : Bool, optional
+        Filters forwards and backwards (sosfiltfilt) so there is no phase shift.
+        Otherwise filters forwards only (sosfilt), e.g. for causal filtering.
+        The default is True.
+    axis : Int, optional
+        Axis of data to filter along. The default is -1.
+
+    Returns
+    -------
+    filtered : Array of Floats
+        Filtered data. Float32 data are filtered and returned in float32, otherwise
+        float64.
+
+    """
+    sos = design_filter(order, cutoff, fs=fs, btype=btype)
+    data = np.asarray(data)
+    if data.dtype == np.float32:
+        # filtering in single precision avoids a double precision copy of the data
+        sos = sos.astype(np.float32)
+    if zero_phase:
+        return sig.sosfiltfilt(sos, data, axis=axis)
+    return sig.sosfilt(sos, data, axis=axis)
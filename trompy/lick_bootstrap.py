@@ -0,0 +1,141 @@
+"""
+Bootstrap confidence intervals for lick microstructure metrics.
+"""
+import numpy as np
+from trompy import _kernels
+from trompy.lickcalc import Lickcalc
+
+STATS = ['burst_number', 'burst_mean', 'intraburst_freq']
+
+# Replicates are generated in fixed-size chunks, each with its own child seed, so that
+# results for a given seed are the same whatever the number of processes.
+_CHUNK_SIZE = 1000
+
+
+def _unit_stats(lickdata, method, block_length):
+    """Per-unit sums (units are bursts or time blocks) from which every replicate is built.
+
+    Returns a (4, n_units) array of number of bursts, licks in bursts, intraburst
+    intervals and summed intraburst interval duration for each unit.
+    """
+    starts, stops = lickdata.burst_bounds
+    burst_licks = (stops - starts).astype(float)
+    # within a burst all intervals are below threshold, so their sum is the burst duration
+    ili_sum = lickdata.licks[stops - 1] - lickdata.licks[starts] if len(starts) else np.array([])
+    per_burst = np.vstack((np.ones(len(starts)), burst_licks, burst_licks - 1, ili_sum))
+
+    if method == 'bursts':
+        return per_burst
+
+    if method == 'blocks':
+        # bursts belong to the block containing their first lick
+        burst_start = lickdata.licks[starts]
+        session_start = lickdata.licks[0]
+        n_blocks = max(int(np.ceil((lickdata.licks[-1] - session_start) / block_length)), 1)
+        edges = session_start + np.arange(n_blocks + 1) * block_length
+        bounds = np.searchsorted(burst_start, edges, side='left')
+        bounds[-1] = len(burst_start)
+        return np.vstack([_kernels.segment_sums(row, bounds[:-1], bounds[1:]) for row in per_burst])
+
+    raise ValueError(f"{method} is not a valid method. Use 'bursts' or 'blocks'.")
+
+
+def _bootstrap_chunk(units, n_boot, seed):
+    """Resamples units with replacement and reduces each replicate to the summary stats."""
+    rng = np.random.default_rng(seed)
+    n_units = units.shape[1]
+    inds = rng.integers(0, n_units, size=(n_boot, n_units))
+    n_bursts, burst_licks, n_ilis, ili_sum = (units[row][inds].sum(axis=1) for row in range(4))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.vstack((n_bursts,
+                          np.where(n_bursts > 0, burst_licks / n_bursts, np.nan),
+                          np.where(ili_sum > 0, n_ilis / ili_sum, np.nan)))
+
+
+def bootstrap_lickcalc(lickdata, n_boot=10000, method='bursts', block_length=60, ci=95,
+                       seed=None, n_jobs=1, **kwargs):
+    """
+    Bootstrap confidence intervals for burst number, mean burst size and intraburst frequency.
+
+    Instead of re-running lickcalc on every resampled lick train, bursts (or blocks of
+    time) are summarised once and each replicate is built by summing these summaries over
+    an array of resampled indices, so all replicates are computed with array operations.
+
+    Parameters
+    ----------
+    lickdata : Lickcalc, List or 1D array
+        Lickcalc object, or lick timestamps from which one is made using `kwargs`.
+    n_boot : Int, optional
+        Number of bootstrap replicates. The default is 10000.
+    method : Str, optional
+        'bursts' resamples whole bursts, which gives CIs for burst size and intraburst
+        frequency (burst number is fixed). 'blocks' resamples blocks of time of
+        `block_length` seconds, so burst number can also vary. The default is 'bursts'.
+    block_length : Float, optional
+        Length (in seconds) of blocks when method is 'blocks'. The default is 60.
+    ci : Float, optional
+        Width of confidence interval in percent. The default is 95.
+    seed : Int or None, optional
+        Seed for random number generator. Results for a given seed do not depend on
+        `n_jobs`. The default is None.
+    n_jobs : Int, optional
+        Number of processes used to compute replicates. The default is 1.
+    **kwargs
+        Passed to Lickcalc if lickdata is not already a Lickcalc object.
+
+    Returns
+    -------
+    output, a dictionary with keys 'burst_number', 'burst_mean' and 'intraburst_freq', each
+    a dictionary with the following keys
+    'estimate' : Float
+        Value for the original data.
+    'ci' : Tuple of Floats
+        Lower and upper bounds of percentile confidence interval.
+    'replicates' : 1D array
+        Value for each bootstrap replicate.
+
+    Notes
+    -----
+    Intraburst frequency is calculated as the reciprocal of the mean intraburst interlick
+    interval, rather than from the modal interval as in Lickcalc, so that it can be summed
+    over resampled bursts.
+    """
+    if n_boot < 1:
+        raise ValueError("n_boot must be at least 1.")
+
+    if not isinstance(lickdata, Lickcalc):
+        lickdata = Lickcalc(licks=lickdata, **kwargs)
+    if len(lickdata.licks) == 0:
+        raise ValueError("No licks to resample.")
+
+    units = _unit_stats(lickdata, method, block_length)
+    if units.shape[1] == 0:
+        raise ValueError("No bursts to resample.")
+
+    chunk_sizes = [_CHUNK_SIZE] * (n_boot // _CHUNK_SIZE)
+    if n_boot % _CHUNK_SIZE:
+        chunk_sizes.append(n_boot % _CHUNK_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    if n_jobs is not None and n_jobs > 1 and len(chunk_sizes) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            chunks = list(pool.map(_bootstrap_chunk, [units] * len(chunk_sizes), chunk_sizes, seeds))
+    else:
+        chunks = [_bootstrap_chunk(units, size, s) for size, s in zip(chunk_sizes, seeds)]
+    replicates = np.hstack(chunks)
+
+    totals = units.sum(axis=1)
+    estimates = [totals[0],
+                 totals[1] / totals[0] if totals[0] > 0 else np.nan,
+                 totals[2] / totals[3] if totals[3] > 0 else np.nan]
+
+    alpha = (100 - ci) / 2
+    output = {}
+    for stat, estimate, values in zip(STATS, estimates, replicates):
+        output[stat] = {'estimate': estimate,
+                        'ci': tuple(np.nanpercentile(values, [alpha, 100 - alpha])),
+                        'replicates': values}
+
+    return output
@@ -0,0 +1,246 @@
+"""
+Compact storage of lickcalc results for group analyses with many sessions.
+"""
+from pathlib import Path
+import numpy as np
+
+# Legacy lickcalc dictionary key for each scalar attribute of LickcalcResult
+_SCALAR_KEYS = {
+    'total': 'total',
+    'burst_number': 'bNum',
+    'burst_mean': 'bMean',
+    'burst_mean_first3': 'bMean-first3',
+    'intraburst_freq': 'freq',
+    'intraburst_mode': 'intraburst_mode',
+    'runs_number': 'rNum',
+    'licklength_mode': 'licklength_mode',
+    'intercontact_mode': 'intercontact_mode',
+    'weib_alpha': 'weib_alpha',
+    'weib_beta': 'weib_beta',
+    'weib_rsq': 'weib_rsq',
+}
+
+# Legacy key and dtype for each per-burst and per-run array
+_BURST_ARRAYS = {
+    'burst_inds': ('bInd', np.int64),
+    'burst_start': ('bStart', np.float64),
+    'burst_end': ('bEnd', np.float64),
+    'burst_licks': ('bLicks', np.int32),
+}
+
+_RUN_ARRAYS = {
+    'runs_inds': ('rInd', np.int64),
+    'runs_start': ('rStart', np.float64),
+    'runs_end': ('rEnd', np.float64),
+    'runs_licks': ('rLicks', np.int32),
+}
+
+# Arrays saved by LickcalcCohort, with offsets of each session into the concatenated arrays
+_ARRAY_KEYS = ['burst_offsets', 'runs_offsets'] + list(_BURST_ARRAYS) + list(_RUN_ARRAYS)
+
+_INT_SCALARS = ('total', 'burst_number', 'runs_number')
+
+
+def _to_float(value):
+    return np.nan if value is None else float(value)
+
+
+def _from_float(value, name):
+    if np.isnan(value):
+        return None
+    if name in _INT_SCALARS:
+        return int(value)
+    return float(value)
+
+
+class LickcalcResult:
+    """
+    Compact summary of a single Lickcalc analysis.
+
+    Scalars are stored in slots and per-burst/per-run values as contiguous typed
+    arrays, so thousands of results take a fraction of the memory needed for the
+    Lickcalc objects or lickcalc dictionaries they were made from. Lick-level arrays
+    (licks, ILIs, lick lengths) are not kept.
+
+    Attributes
+    ----------
+    total, burst_number, burst_mean, burst_mean_first3, intraburst_freq,
+    intraburst_mode, runs_number, licklength_mode, intercontact_mode,
+    weib_alpha, weib_beta, weib_rsq : Int, Float or None
+        Same as the equivalent Lickcalc attributes.
+    burst_inds, burst_start, burst_end, burst_licks : 1D arrays
+        Per-burst values.
+    runs_inds, runs_start, runs_end, runs_licks : 1D arrays
+        Per-run values.
+
+    Examples
+    --------
+    >>> result = LickcalcResult.from_lickcalc(Lickcalc(licks=licks))
+    >>> legacy = result.to_dict()
+    >>> result = LickcalcResult.from_dict(lickcalc(licks))
+    """
+    __slots__ = tuple(_SCALAR_KEYS) + tuple(_BURST_ARRAYS) + tuple(_RUN_ARRAYS)
+
+    def __init__(self, **kwargs):
+        for name in _SCALAR_KEYS:
+            setattr(self, name, kwargs.get(name, None))
+        for name, (_, dtype) in {**_BURST_ARRAYS, **_RUN_ARRAYS}.items():
+            values = kwargs.get(name, None)
+            setattr(self, name, np.asarray([] if values is None else values, dtype=dtype))
+
+    @classmethod
+    def from_lickcalc(cls, lickdata):
+        """Makes a result from a Lickcalc object."""
+        weibull_params = lickdata.weibull_params or [None, None, None]
+        kwargs = {name: getattr(lickdata, name) for name in _SCALAR_KEYS if hasattr(lickdata, name)}
+        kwargs.update({name: getattr(lickdata, name) for name in {**_BURST_ARRAYS, **_RUN_ARRAYS}})
+        kwargs['weib_alpha'], kwargs['weib_beta'], kwargs['weib_rsq'] = weibull_params
+        return cls(**kwargs)
+
+    @classmethod
+    def from_dict(cls, lickdata):
+        """Makes a result from a dictionary returned by lickcalc."""
+        kwargs = {name: lickdata.get(key, None) for name, key in _SCALAR_KEYS.items()}
+        for name, (key, _) in {**_BURST_ARRAYS, **_RUN_ARRAYS}.items():
+            kwargs[name] = lickdata.get(key, None)
+        return cls(**kwargs)
+
+    def to_dict(self):
+        """Returns the result as a dictionary using the legacy lickcalc keys."""
+        output = {key: getattr(self, name) for name, key in _SCALAR_KEYS.items()}
+        for name, (key, _) in {**_BURST_ARRAYS, **_RUN_ARRAYS}.items():
+            output[key] = getattr(self, name).tolist()
+        output['bTime'] = self.burst_lengths.tolist()
+        output['rTime'] = self.runs_length.tolist()
+        output['IBIs'] = self.interburst_intervals
+        return output
+
+    @property
+    def burst_lengths(self):
+        return self.burst_end - self.burst_start
+
+    @property
+    def runs_length(self):
+        return self.runs_end - self.runs_start
+
+    @property
+    def interburst_intervals(self):
+        if len(self.burst_start) == 0:
+            return None
+        return self.burst_start[1:] - self.burst_end[:-1]
+
+    def __repr__(self):
+        return f"LickcalcResult(total={self.total}, burst_number={self.burst_number}, runs_number={self.runs_number})"
+
+
+class LickcalcCohort:
+    """
+    Collection of LickcalcResults stored as one table of scalars plus concatenated
+    per-burst and per-run arrays, which can be saved to and loaded from a single file.
+
+    When loaded from a file, only the scalar table is read straight away. Each per-burst
+    and per-run array is read the first time a session needs it, or all at once with
+    load_all.
+
+    Parameters
+    ----------
+    results : List of LickcalcResult, Lickcalc or lickcalc dictionaries
+        Sessions to store.
+    names : List of Str, optional
+        Name for each session, e.g. rat and session ID. The default is None.
+
+    Examples
+    --------
+    >>> cohort = LickcalcCohort([lickcalc(licks) for licks in all_licks], names=rats)
+    >>> cohort.save("cohort.npz")
+    >>> cohort = LickcalcCohort.load("cohort.npz")
+    >>> cohort.get("burst_mean")
+    >>> cohort[0].burst_licks
+    """
+    def __init__(self, results=None, names=None):
+        results = [self._as_result(r) for r in (results or [])]
+        self.names = list(names) if names is not None else [str(i) for i in range(len(results))]
+        if len(self.names) != len(results):
+            raise ValueError("Number of names does not match number of results.")
+
+        self.scalars = np.array([[_to_float(getattr(r, name)) for name in _SCALAR_KEYS] for r in results],
+                                dtype=np.float64).reshape(len(results), len(_SCALAR_KEYS))
+        self._arrays = {}
+        for group, fields in [('burst', _BURST_ARRAYS), ('runs', _RUN_ARRAYS)]:
+            lengths = [len(getattr(r, next(iter(fields)))) for r in results]
+            self._arrays[group + '_offsets'] = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)))
+            for name, (_, dtype) in fields.items():
+                self._arrays[name] = np.concatenate([getattr(r, name) for r in results]).astype(dtype) \
+                    if results else np.array([], dtype=dtype)
+        self._path = None
+
+    @staticmethod
+    def _as_result(result):
+        if isinstance(result, LickcalcResult):
+            return result
+        if isinstance(result, dict):
+            return LickcalcResult.from_dict(result)
+        return LickcalcResult.from_lickcalc(result)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _array(self, name):
+        # per-burst and per-run arrays are only read from file the first time each is used
+        if name not in self._arrays:
+            with np.load(self._path, allow_pickle=False) as store:
+                self._arrays[name] = store[name]
+        return self._arrays[name]
+
+    def __getitem__(self, idx):
+        if isinstance(idx, str):
+            idx = self.names.index(idx)
+        kwargs = {name: _from_float(value, name) for name, value in zip(_SCALAR_KEYS, self.scalars[idx])}
+        for group, fields in [('burst', _BURST_ARRAYS), ('runs', _RUN_ARRAYS)]:
+            offsets = self._array(group + '_offsets')
+            for name in fields:
+                kwargs[name] = self._array(name)[offsets[idx]:offsets[idx + 1]]
+        return LickcalcResult(**kwargs)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def get(self, name):
+        """Returns a scalar (e.g. 'burst_mean') for all sessions as a 1D array, NaN where None."""
+        return self.scalars[:, list(_SCALAR_KEYS).index(name)]
+
+    def to_dicts(self):
+        """Returns a list of legacy lickcalc dictionaries, one per session."""
+        return [result.to_dict() for result in self]
+
+    def save(self, path):
+        """Saves the cohort to a single uncompressed .npz file."""
+        arrays = {name: self._array(name) for name in _ARRAY_KEYS}
+        np.savez(path, scalars=self.scalars, scalar_names=np.array(list(_SCALAR_KEYS)),
+                 names=np.array(self.names, dtype=str), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a cohort saved with save. Per-burst and per-run arrays are read when a
+        session is first accessed, so the file should not be changed before then.
+        """
+        with np.load(Path(path), allow_pickle=False) as store:
+            if list(store['scalar_names']) != list(_SCALAR_KEYS):
+                raise ValueError(f"{path} was not saved by a compatible version of LickcalcCohort.")
+
+            cohort = cls.__new__(cls)
+            cohort.names = store['names'].tolist()
+            cohort.scalars = store['scalars']
+        cohort._arrays = {}
+        cohort._path = Path(path)
+        return cohort
+
+    def load_all(self):
+        """Reads any arrays not yet read from the file the cohort was loaded from."""
+        missing = [name for name in _ARRAY_KEYS if name not in self._arrays]
+        if missing:
+            with np.load(self._path, allow_pickle=False) as store:
+                for name in missing:
+                    self._arrays[name] = store[name]
@@ -7,7 +7,108 @@ Created on Fri Apr 17 13:40:05 2020
 from pathlib import Path
 import numpy as np
 import warnings
-from trompy.lickcalc import Lickcalc
+from trompy import _kernels
+from trompy.lickcalc import Lickcalc, calculate_burst_prob, fit_weibull, get_mode
+
+
+def _get_segment_inds(licks, seg_start, seg_end, closed_end=None):
+    """Finds index ranges of licks that fall within each time segment.
+
+    Segments are half-open, [seg_start, seg_end), unless `closed_end` is True for
+    that segment in which case licks at exactly seg_end are included. Licks must be
+    sorted so that boundaries can be found with a binary search instead of scanning
+    every lick for every segment.
+    """
+    licks = np.asarray(licks)
+    starts = np.searchsorted(licks, seg_start, side='left')
+    stops = np.searchsorted(licks, seg_end, side='left')
+    if closed_end is not None:
+        stops_closed = np.searchsorted(licks, seg_end, side='right')
+        stops = np.where(closed_end, stops_closed, stops)
+
+    return starts, stops
+
+
+def _empty_segment_stats():
+    return {
+        'total_licks': 0,
+        'intraburst_freq': np.nan,
+        'n_bursts': 0,
+        'mean_licks_per_burst': np.nan,
+        'weibull_alpha': None,
+        'weibull_beta': None,
+        'weibull_rsq': None,
+        'n_long_licks': 0,
+        'max_lick_duration': np.nan
+    }
+
+
+def _compute_segment_stats(lickdata, starts, stops):
+    """Calculates statistics for segments of licks given as index ranges into lickdata.licks.
+
+    Each segment is analysed as if it were its own train of licks, i.e. bursts are
+    split at segment boundaries, but the diffs, burst boundaries and lick lengths are
+    computed once for the whole session and then sliced for each segment.
+    """
+    licks = lickdata.licks
+    ilis = np.diff(licks)
+    burst_breaks = _kernels.segment_bounds(licks, lickdata.burst_threshold)[0][1:]
+
+    # lick lengths aligned with licks (NaN for licks without an offset)
+    if lickdata.offset is not None:
+        licklength = lickdata.offset - lickdata.licks[:len(lickdata.offset)]
+    else:
+        licklength = np.array([])
+
+    n_first = lickdata.only_return_first_n_bursts
+    if not (n_first and isinstance(n_first, int) and n_first > 0):
+        n_first = None
+
+    segment_stats = []
+    for start, stop in zip(starts, stops):
+        if stop <= start:
+            segment_stats.append(_empty_segment_stats())
+            continue
+
+        # bursts are the global burst boundaries that fall inside the segment
+        lo, hi = np.searchsorted(burst_breaks, [start + 1, stop])
+        inner = burst_breaks[lo:hi]
+        burst_licks = np.diff(np.concatenate(([start], inner, [stop])))
+        burst_licks = burst_licks[burst_licks >= lickdata.min_burst_length]
+        if n_first is not None:
+            burst_licks = burst_licks[:n_first]
+        n_bursts = len(burst_licks)
+
+        intraburst_freq = None
+        if n_bursts > 0 and np.max(burst_licks) > 1:
+            segment_ilis = ilis[start:stop - 1]
+            mode = get_mode(segment_ilis[segment_ilis < lickdata.burst_threshold])
+            if mode:
+                intraburst_freq = 1 / mode
+
+        weibull_params = None
+        if n_bursts > 0:
+            try:
+                weibull_params = fit_weibull(*calculate_burst_prob(burst_licks.tolist()))
+            except Exception:
+                weibull_params = None
+
+        segment_licklength = licklength[start:min(stop, len(licklength))]
+        segment_licklength = segment_licklength[~np.isnan(segment_licklength)]
+
+        segment_stats.append({
+            'total_licks': int(stop - start),
+            'intraburst_freq': intraburst_freq,
+            'n_bursts': n_bursts,
+            'mean_licks_per_burst': np.mean(burst_licks) if n_bursts > 0 else None,
+            'weibull_alpha': weibull_params[0] if weibull_params else None,
+            'weibull_beta': weibull_params[1] if weibull_params else None,
+            'weibull_rsq': weibull_params[2] if weibull_params else None,
+            'n_long_licks': int(np.sum(segment_licklength > lickdata.longlick_threshold)),
+            'max_lick_duration': np.max(segment_licklength) if len(segment_licklength) > 0 else np.nan
+        })
+
+    return segment_stats
 
 
 def _compute_time_divisions(lickdata, n_divisions, session_length=None):
@@ -23,38 +124,62 @@ def _compute_time_divisions(lickdata, n_divisions, session_length=None):
         end_time = lickdata.licks[-1]
     
     duration_per_division = (end_time - start_time) / n_divisions
-    divisions = []
-    
-    for i in range(n_divisions):
-        div_start = start_time + i * duration_per_division
-        div_end = start_time + (i + 1) * duration_per_division
-        
-        # Get licks within this time range
-        if i == n_divisions - 1:  # Last division includes end boundary
-            segment_licks = [t for t in lickdata.licks if div_start <= t <= div_end]
-        else:
-            segment_licks = [t for t in lickdata.licks if div_start <= t < div_end]
-        
-        # Get corresponding offsets if available
-        segment_offsets = _get_corresponding_offsets(lickdata, segment_licks)
-        
-        # Calculate statistics for this segment
-        stats = _calculate_segment_stats(lickdata, segment_licks, segment_offsets)
-        
+    div_starts = start_time + np.arange(n_divisions) * duration_per_division
+    div_ends = start_time + np.arange(1, n_divisions + 1) * duration_per_division
+
+    # Last division includes end boundary
+    closed_end = np.arange(n_divisions) == n_divisions - 1
+    starts, stops = _get_segment_inds(lickdata.licks, div_starts, div_ends, closed_end)
+
+    divisions = _compute_segment_stats(lickdata, starts, stops)
+    for i, stats in enumerate(divisions):
         # Add division metadata
         stats.update({
             'division_type': 'time',
             'division_number': i + 1,
-            'start_time': div_start,
-            'end_time': div_end,
-            'duration': div_end - div_start
+            'start_time': div_starts[i],
+            'end_time': div_ends[i],
+            'duration': div_ends[i] - div_starts[i]
         })
-        
-        divisions.append(stats)
     
     return divisions
 
 
+def _compute_time_windows(lickdata, window_length, window_step=None, session_length=None):
+    """Compute statistics for sliding (possibly overlapping) time windows"""
+    if not len(lickdata.licks) or window_length is None or window_length <= 0:
+        return []
+
+    if window_step is None or window_step <= 0:
+        window_step = window_length
+
+    start_time = lickdata.licks[0]
+    if session_length is not None:
+        end_time = start_time + session_length
+    else:
+        end_time = lickdata.licks[-1]
+
+    # All windows that fit within the session, or one window if the session is shorter
+    n_windows = max(1, int(np.floor((end_time - start_time - window_length) / window_step + 1e-9)) + 1)
+    win_starts = start_time + np.arange(n_windows) * window_step
+    win_ends = win_starts + window_length
+
+    closed_end = np.isclose(win_ends, end_time) | (win_ends > end_time)
+    starts, stops = _get_segment_inds(lickdata.licks, win_starts, win_ends, closed_end)
+
+    windows = _compute_segment_stats(lickdata, starts, stops)
+    for i, stats in enumerate(windows):
+        stats.update({
+            'division_type': 'window',
+            'division_number': i + 1,
+            'start_time': win_starts[i],
+            'end_time': win_ends[i],
+            'duration': window_length
+        })
+
+    return windows
+
+
 def _compute_burst_divisions(lickdata, n_divisions):
     """Compute statistics for burst-based divisions"""
     if not len(lickdata.licks) or n_divisions <= 0:
@@ -66,30 +191,27 @@ def _compute_burst_divisions(lickdata, n_divisions):
     
     # Calculate bursts per division
     bursts_per_division = max(1, lickdata.burst_number // n_divisions)
-    divisions = []
-    
-    for i in range(n_divisions):
-        start_burst = i * bursts_per_division
-        
-        if i == n_divisions - 1:
-            # Last division gets all remaining bursts
-            end_burst = lickdata.burst_number
-        else:
-            end_burst = (i + 1) * bursts_per_division
-        
-        # Get licks for this burst range
-        segment_licks = _get_licks_for_burst_range(lickdata, start_burst, end_burst)
-        
-        # Get corresponding offsets if available
-        segment_offsets = _get_corresponding_offsets(lickdata, segment_licks)
-        
-        # Calculate statistics for this segment
-        stats = _calculate_segment_stats(lickdata, segment_licks, segment_offsets)
-        
+    start_bursts = np.arange(n_divisions) * bursts_per_division
+    end_bursts = np.arange(1, n_divisions + 1) * bursts_per_division
+    # Last division gets all remaining bursts
+    end_bursts[-1] = lickdata.burst_number
+
+    # Segments run from the first lick of the first burst to the last lick of the last burst
+    burst_starts, burst_stops = lickdata.burst_bounds
+    valid = start_bursts < np.minimum(end_bursts, lickdata.burst_number)
+    starts = np.zeros(n_divisions, dtype=int)
+    stops = np.zeros(n_divisions, dtype=int)
+    starts[valid] = burst_starts[start_bursts[valid]]
+    stops[valid] = burst_stops[np.minimum(end_bursts[valid], lickdata.burst_number) - 1]
+
+    divisions = _compute_segment_stats(lickdata, starts, stops)
+    for i, stats in enumerate(divisions):
+        start_burst, end_burst = int(start_bursts[i]), int(end_bursts[i])
+
         # Calculate time boundaries for burst division
-        if segment_licks:
-            div_start_time = min(segment_licks)
-            div_end_time = max(segment_licks)
+        if valid[i]:
+            div_start_time = lickdata.licks[starts[i]]
+            div_end_time = lickdata.licks[stops[i] - 1]
         else:
             # Estimate times for empty divisions
             session_duration = lickdata.licks[-1] - lickdata.licks[0] if len(lickdata.licks) > 1 else 0
@@ -108,119 +230,10 @@ def _compute_burst_divisions(lickdata, n_divisions):
             'end_time': div_end_time,
             'duration': div_end_time - div_start_time
         })
-        
-        divisions.append(stats)
     
     return divisions
 
 
-def _get_licks_for_burst_range(lickdata, start_burst, end_burst):
-    """Extract licks that belong to a specific range of bursts"""
-    if start_burst >= end_burst or lickdata.burst_number == 0:
-        return []
-    
-    # Ensure valid burst range
-    start_burst = max(0, min(start_burst, lickdata.burst_number))
-    end_burst = max(start_burst, min(end_burst, lickdata.burst_number))
-    
-    if start_burst == end_burst:
-        return []
-    
-    # Extract the time boundaries for our burst range
-    if start_burst < len(lickdata.burst_start):
-        range_start_time = float(lickdata.burst_start[start_burst])
-    else:
-        range_start_time = lickdata.licks[0]
-    
-    if end_burst - 1 < len(lickdata.burst_end):
-        range_end_time = float(lickdata.burst_end[end_burst - 1])
-    else:
-        range_end_time = lickdata.licks[-1]
-    
-    # Return licks within this time range
-    return [t for t in lickdata.licks if range_start_time <= t <= range_end_time]
-
-
-def _get_corresponding_offsets(lickdata, segment_licks):
-    """Get corresponding offset times for a segment of licks"""
-    if lickdata.offset is None or not segment_licks:
-        return []
-    
-    # Use numpy boolean indexing for O(n) performance instead of O(n²) .index() loop
-    segment_licks_array = np.array(segment_licks)
-    mask = np.isin(lickdata.licks, segment_licks_array)
-    segment_indices = np.where(mask)[0]
-    
-    # Return corresponding offsets
-    valid_indices = segment_indices[segment_indices < len(lickdata.offset)]
-    if len(valid_indices) > 0:
-        return lickdata.offset[valid_indices].tolist()
-    
-    return []
-
-
-def _calculate_segment_stats(lickdata, segment_licks, segment_offsets):
-    """Calculate comprehensive statistics for a segment of licks"""
-    if not segment_licks:
-        return {
-            'total_licks': 0,
-            'intraburst_freq': np.nan,
-            'n_bursts': 0,
-            'mean_licks_per_burst': np.nan,
-            'weibull_alpha': None,
-            'weibull_beta': None,
-            'weibull_rsq': None,
-            'n_long_licks': 0,
-            'max_lick_duration': np.nan
-        }
-    
-    # Create a temporary Lickcalc object for this segment
-    try:
-        segment_calc = Lickcalc(
-            licks=segment_licks,
-            offset=segment_offsets,
-            burst_threshold=lickdata.burst_threshold,
-            longlick_threshold=lickdata.longlick_threshold,
-            min_burst_length=lickdata.min_burst_length,
-            ignorelongilis=lickdata.ignorelongilis,
-            remove_longlicks=lickdata.remove_longlicks,
-            only_return_first_n_bursts=lickdata.only_return_first_n_bursts,
-            run_threshold=lickdata.run_threshold,
-            min_run_length=lickdata.min_run_length,
-            binsize=lickdata.binsize,
-            hist_density=lickdata.hist_density
-        )
-        
-        # Extract statistics
-        stats = {
-            'total_licks': segment_calc.total,
-            'intraburst_freq': segment_calc.intraburst_freq,
-            'n_bursts': segment_calc.burst_number,
-            'mean_licks_per_burst': segment_calc.burst_mean,
-            'weibull_alpha': segment_calc.weibull_params[0] if segment_calc.weibull_params else None,
-            'weibull_beta': segment_calc.weibull_params[1] if segment_calc.weibull_params else None,
-            'weibull_rsq': segment_calc.weibull_params[2] if segment_calc.weibull_params else None,
-            'n_long_licks': len(segment_calc.longlicks) if segment_calc.longlicks is not None else 0,
-            'max_lick_duration': np.max(segment_calc.licklength) if segment_calc.licklength is not None and len(segment_calc.licklength) > 0 else np.nan
-        }
-        
-    except Exception:
-        # Fallback for problematic segments
-        stats = {
-            'total_licks': len(segment_licks),
-            'intraburst_freq': np.nan,
-            'n_bursts': 0,
-            'mean_licks_per_burst': np.nan,
-            'weibull_alpha': None,
-            'weibull_beta': None,
-            'weibull_rsq': None,
-            'n_long_licks': 0,
-            'max_lick_duration': np.nan
-        }
-    
-    return stats
-
-
 def _create_empty_burst_division(lickdata, division_number):
     """Create an empty burst division for cases with no bursts"""
     return {
@@ -247,7 +260,8 @@ def lickcalc(licks, offset = [], burstThreshold = 0.5, runThreshold = 10,
              minrunlength=1,
              binsize=60, histDensity = False, remove_longlicks=False,
              only_return_first_n_bursts=False,
-             time_divisions=None, burst_divisions=None, session_length=None):
+             time_divisions=None, burst_divisions=None, session_length=None,
+             window_length=None, window_step=None, pair_offsets=None):
     """
     Calculates various parameters for a train of licking data including bursting 
     parameters and returns as a dictionary. Legacy function that returns a dictionary.
@@ -284,6 +298,15 @@ def lickcalc(licks, offset = [], burstThreshold = 0.5, runThreshold = 10,
         Number of divisions based on burst count distribution. The default is None.
     session_length : Float, optional
         Total session length in seconds (for time divisions). If None, uses actual data duration. The default is None.
+    window_length : Float, optional
+        Length (in seconds) of sliding time windows for temporal analysis. The default is None.
+    window_step : Float, optional
+        Time (in seconds) between the starts of consecutive sliding windows. Windows overlap
+        if this is shorter than `window_length`. If None, windows are back-to-back. The default is None.
+    pair_offsets : Boolean or None, optional
+        If True, matches each onset to its offset using `pair_licks` instead of assuming
+        offsets and onsets correspond one-to-one. If None, pairing is only done when
+        numbers of onsets and offsets differ or they are misaligned. The default is None.
 
     Returns
     -------
@@ -302,6 +325,10 @@ def lickcalc(licks, offset = [], burstThreshold = 0.5, runThreshold = 10,
         Mean frequency (in Hz) of intraburst licking (None if no bursts)
     'intraburst_mode' : Float or None
         Modal inter-lick interval within bursts (None if no bursts)
+    'unmatched_licks' : 1D array or None
+        Onsets without a matching offset (None if offsets were not paired)
+    'unmatched_offsets' : 1D array or None
+        Offsets without a matching onset (None if offsets were not paired)
     'total' : Int
         Number of licks
     'bStart' : List of floats
@@ -363,6 +390,9 @@ def lickcalc(licks, offset = [], burstThreshold = 0.5, runThreshold = 10,
         Each dict contains same statistics as time_divisions, plus:
             - start_burst : int, end_burst : int (burst indices)
             - start_time : float, end_time : float (estimated time boundaries)
+    'time_windows' : List of dicts, optional
+        Sliding window analysis results (if window_length specified).
+        Each dict contains same statistics as time_divisions with division_type 'window'.
 
     Notes
     ----------
@@ -387,6 +417,9 @@ def lickcalc(licks, offset = [], burstThreshold = 0.5, runThreshold = 10,
 
     With session length and divisions:
     >>> results = lickcalc(lick_times, time_divisions=4, session_length=600)
+
+    With overlapping 5-min windows every minute:
+    >>> results = lickcalc(lick_times, window_length=300, window_step=60)
     """
 
     lickdata = Lickcalc(licks=licks,
@@ -400,7 +433,8 @@ def lickcalc(licks, offset = [], burstThreshold = 0.5, runThreshold = 10,
                         run_threshold=runThreshold,
                         min_run_length=minrunlength,
                         binsize=binsize,
-                        hist_density=histDensity)
+                        hist_density=histDensity,
+                        pair_offsets=pair_offsets)
     
     if lickdata.weibull_params is None:
         lickdata.weibull_params = [None, None, None]
@@ -415,6 +449,8 @@ def lickcalc(licks, offset = [], burstThreshold = 0.5, runThreshold = 10,
             'intraburst_mode' : lickdata.intraburst_mode,
             'intercontact_time' : lickdata.intercontact_time,
             'intercontact_mode' : lickdata.intercontact_mode,
+            'unmatched_licks' : lickdata.unmatched_licks,
+            'unmatched_offsets' : lickdata.unmatched_offsets,
             'total' : lickdata.total,
             'bStart' : lickdata.burst_start,
             'bInd' : lickdata.burst_inds,
@@ -448,6 +484,11 @@ def lickcalc(licks, offset = [], burstThreshold = 0.5, runThreshold = 10,
         results['burst_divisions'] = _compute_burst_divisions(
             lickdata, burst_divisions
         )
+
+    if window_length is not None and window_length > 0:
+        results['time_windows'] = _compute_time_windows(
+            lickdata, window_length, window_step, session_length
+        )
     
     return results
 
@@ -457,7 +498,8 @@ def lickCalc(licks, offset = [], burstThreshold = 0.5, runThreshold = 10,
              minrunlength=1,
              binsize=60, histDensity = False, remove_longlicks=False,
              only_return_first_n_bursts=False,
-             time_divisions=None, burst_divisions=None, session_length=None):
+             time_divisions=None, burst_divisions=None, session_length=None,
+             window_length=None, window_step=None, pair_offsets=None):
     """
     Deprecated: Use `lickcalc` (lowercase) instead.
     
@@ -474,7 +516,120 @@ def lickCalc(licks, offset = [], burstThreshold = 0.5, runThreshold = 10,
                    ignorelongilis, longlickThreshold, minburstlength,
                    minrunlength, binsize, histDensity, remove_longlicks,
                    only_return_first_n_bursts, time_divisions, burst_divisions,
-                   session_length)
+                   session_length, window_length, window_step, pair_offsets)
 
 
+def lickcalc_subsets(licks, masks=None, labels=None, burstThreshold=0.5, runThreshold=10,
+                     minburstlength=1, minrunlength=1):
+    """
+    Calculates burst, run and interlick interval statistics for several subsets of a
+    single train of licks, e.g. licks during reward vs licks during non-reward.
+
+    Each subset is analysed as if it were its own train of licks (i.e. the same as
+    calling `lickcalc` on the licks in that subset) but all subsets are done together:
+    licks from every subset are gathered into one array so that the diffs, burst and
+    run boundaries and counts are computed in a single vectorised pass.
+
+    Parameters
+    ----------
+    licks : List or 1D array
+        Timestamps of lick onsets, in ascending order.
+    masks : Dict or List of boolean arrays, optional
+        One boolean array (same length as `licks`) per subset. If a dictionary, keys are
+        used as subset names. Masks can overlap. The default is None.
+    labels : List or 1D array, optional
+        Category label for each lick, used instead of `masks`. Each unique label is
+        one subset. The default is None.
+    burstThreshold : Float, optional
+        Interlick threshold (in seconds) for defining bursts. The default is 0.5.
+    runThreshold : Float or Int, optional
+        Number of seconds separating runs of licks. The default is 10.
+    minburstlength : Int, optional
+        Minimum number of licks to be considered a burst. The default is 1.
+    minrunlength : Int, optional
+        Minimum number of licks to be considered a run. The default is 1.
+
+    Returns
+    -------
+    table : DataFrame
+        One row per subset with columns 'subset', 'total_licks', 'n_bursts',
+        'mean_licks_per_burst', 'intraburst_freq', 'intraburst_mode', 'n_runs',
+        'mean_licks_per_run' and 'mean_ili'.
+
+    Examples
+    --------
+    >>> table = lickcalc_subsets(licks, masks={'reward': rewarded, 'no reward': ~rewarded})
+    >>> table = lickcalc_subsets(licks, labels=trial_type)
+    """
+    import pandas as pd
+
+    licks = np.asarray(licks, dtype=float)
+
+    # Gather the licks of every subset into one array with a subset id for each lick
+    if labels is not None:
+        names, codes = np.unique(np.asarray(labels), return_inverse=True)
+        order = np.argsort(codes, kind='stable')
+        ids = codes[order]
+    elif masks is not None:
+        if isinstance(masks, dict):
+            names, masks = list(masks.keys()), list(masks.values())
+        else:
+            names = list(range(len(masks)))
+        mask_inds = [np.flatnonzero(np.asarray(mask, dtype=bool)) for mask in masks]
+        order = np.concatenate(mask_inds) if mask_inds else np.array([], dtype=int)
+        ids = np.repeat(np.arange(len(mask_inds)), [len(inds) for inds in mask_inds])
+    else:
+        raise ValueError("Either masks or labels must be given.")
+
+    n_subsets = len(names)
+    t = licks[order]
+    diffs = np.diff(t)
+    same_subset = ids[1:] == ids[:-1]
+
+    subset_starts = np.flatnonzero(np.concatenate(([True], ~same_subset))) if len(t) else np.array([], dtype=np.int64)
+
+    def segment_counts(threshold, min_length):
+        # a new segment starts at the first lick of each subset or after a long interval
+        starts = np.union1d(_kernels.segment_bounds(t, threshold)[0], subset_starts)
+        lengths = np.diff(np.append(starts, len(t)))
+        keep = lengths >= min_length
+        segment_ids = ids[starts][keep]
+        n = np.bincount(segment_ids, minlength=n_subsets)
+        licks_in_segments = np.bincount(segment_ids, weights=lengths[keep], minlength=n_subsets)
+        max_length = np.zeros(n_subsets)
+        np.maximum.at(max_length, segment_ids, lengths[keep])
+        return n, licks_in_segments, max_length
+
+    n_bursts, burst_licks, max_burst = segment_counts(burstThreshold, minburstlength)
+    n_runs, run_licks, _ = segment_counts(runThreshold, minrunlength)
+
+    ilis = diffs[same_subset]
+    ili_ids = ids[1:][same_subset]
+
+    # ILIs of each subset are contiguous, so are summed as segments and sliced for modes
+    ili_bounds = np.searchsorted(ili_ids, np.arange(n_subsets + 1))
+    n_ilis = np.diff(ili_bounds)
+    ili_sum = _kernels.segment_sums(ilis, ili_bounds[:-1], ili_bounds[1:])
+
+    intraburst_mode = np.full(n_subsets, np.nan)
+    for i in range(n_subsets):
+        if n_bursts[i] > 0 and max_burst[i] > 1:
+            subset_ilis = ilis[ili_bounds[i]:ili_bounds[i + 1]]
+            mode = get_mode(subset_ilis[subset_ilis < burstThreshold])
+            if mode is not None:
+                intraburst_mode[i] = mode
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table = pd.DataFrame({
+            'subset': names,
+            'total_licks': np.bincount(ids, minlength=n_subsets),
+            'n_bursts': n_bursts,
+            'mean_licks_per_burst': np.where(n_bursts > 0, burst_licks / n_bursts, np.nan),
+            'intraburst_freq': 1 / intraburst_mode,
+            'intraburst_mode': intraburst_mode,
+            'n_runs': n_runs,
+            'mean_licks_per_run': np.where(n_runs > 0, run_licks / n_runs, np.nan),
+            'mean_ili': np.where(n_ilis > 0, ili_sum / n_ilis, np.nan),
+        })
 
+    return table
@@ -1,9 +1,8 @@
 
 from pathlib import Path
+import warnings
 import numpy as np
-import pandas as pd
-from scipy import stats
-import scipy.optimize as opt
+from trompy import _kernels
 
 class Lickcalc:
     """
@@ -39,9 +38,18 @@ class Lickcalc:
         If True, filter out licks exceeding longlick_threshold before analysis.
     only_return_first_n_bursts : int or False, default False
         If an integer, keep only the first N bursts. Useful for fixed-duration sessions.
+    pair_offsets : bool or None, default None
+        If True, match each onset to its offset with `pair_licks` rather than assuming
+        offset[i] belongs to licks[i]. If None, pairing is only done when the number of
+        onsets and offsets differ or offset[i] does not fall between licks[i] and
+        licks[i+1] (e.g. because of dropped or spurious TTLs).
 
     Attributes (Burst Analysis)
     ---------------------------
+    burst_bounds : tuple of arrays
+        (starts, stops) indices of each burst, so licks[starts[i]:stops[i]] is burst i.
+    bursts : list of array_like
+        Views into licks for each burst (built on demand from burst_bounds).
     burst_inds : list
         Indices where bursts begin.
     burst_licks : list
@@ -71,8 +79,10 @@ class Lickcalc:
 
     Attributes (Run Analysis)
     -------------------------
+    runs_bounds : tuple of arrays
+        (starts, stops) indices of each run, so licks[starts[i]:stops[i]] is run i.
     runs : list of array_like
-        Arrays of lick times for each run.
+        Views into licks for each run (built on demand from runs_bounds).
     runs_start : list
         Onset time of each run.
     runs_inds : list
@@ -91,7 +101,12 @@ class Lickcalc:
     licks : array_like
         Processed lick onset times (filtered if remove_longlicks=True).
     offset : array_like or None
-        Processed lick offset times (filtered if remove_longlicks=True).
+        Processed lick offset times (filtered if remove_longlicks=True). If offsets were
+        paired, aligned with licks and NaN for licks without an offset.
+    unmatched_licks : array_like or None
+        Lick onsets without a matching offset (None if offsets were not paired).
+    unmatched_offsets : array_like or None
+        Offsets without a matching onset (None if offsets were not paired).
     total : int
         Total number of licks.
     licklength : array_like or None
@@ -122,6 +137,8 @@ class Lickcalc:
         Filter out runs with fewer licks than min_run_length.
     get_ilis_in_bursts() : DataFrame
         Compute inter-lick intervals with burst context and surrounding gaps.
+    rolling(window, step) : dict
+        Lick rate, burst size and intraburst frequency as time series on a regular grid.
 
     Examples
     --------
@@ -147,15 +164,32 @@ class Lickcalc:
         self.licks_raw = np.array(kwargs.get('licks', None))  # Store original licks
         self.licks = self.licks_raw.copy()
 
+        self.pair_offsets = kwargs.get('pair_offsets', None)
+        self.unmatched_licks = None
+        self.unmatched_offsets = None
+
         if "offset" in kwargs and kwargs['offset'] is not None and len(kwargs['offset']) > 0:
             self.offset_raw = np.array(kwargs['offset'])  # Store original offsets
             self.offset = self.offset_raw.copy()
 
+            # By default only pair when onsets and offsets cannot correspond one-to-one
+            if self.pair_offsets or (self.pair_offsets is None and not offsets_aligned(self.licks, self.offset)):
+                pairs = pair_licks(self.licks, self.offset_raw)
+                self.offset = pairs['offset']
+                self.unmatched_licks = self.licks[pairs['unmatched_licks']]
+                self.unmatched_offsets = self.offset_raw[pairs['unmatched_offsets']]
+                # only warns if pairing failed, as a last lick without an offset (session
+                # ended mid-lick) is expected
+                if len(self.unmatched_offsets) > 0 or np.any(pairs['unmatched_licks'] < len(self.licks) - 1):
+                    warnings.warn(f"{len(self.unmatched_licks)} onsets and {len(self.unmatched_offsets)} offsets "
+                                  "could not be paired. See unmatched_licks and unmatched_offsets.")
+
             self.intercontact_time = self.get_intercontact_time()
             self.intercontact_mode = get_mode(self.intercontact_time)
             
-            # Calculate lick lengths first (before any filtering)
-            temp_licklength = self.get_licklengths()
+            # Calculate lick lengths first (before any filtering), NaN where a lick has no offset
+            aligned_licklength = self.get_licklengths()
+            temp_licklength = aligned_licklength[~np.isnan(aligned_licklength)]
             
             if len(temp_licklength) > 0:
                 # Identify longlicks before filtering
@@ -165,13 +199,14 @@ class Lickcalc:
                 # Remove longlicks if requested
                 if self.remove_longlicks and self.longlicks is not None:
                     # Create mask to keep only non-longlicks
-                    keep_mask = temp_licklength <= self.longlick_threshold
+                    keep_mask = ~(aligned_licklength > self.longlick_threshold)
                     n_to_keep = min(len(self.licks), len(keep_mask))
                     self.licks = self.licks[:n_to_keep][keep_mask[:n_to_keep]]
                     self.offset = self.offset[:n_to_keep][keep_mask[:n_to_keep]]
                 
                 # Calculate final licklength on filtered data
-                self.licklength = self.get_licklengths()
+                licklength = self.get_licklengths()
+                self.licklength = licklength[~np.isnan(licklength)]
                 self.licklength_mode = get_mode(self.licklength)
             else:
                 self.longlicks = None
@@ -191,11 +226,8 @@ class Lickcalc:
         self.ilis = self.get_ilis()
         self.total = self.get_total_licks()
 
-        self.burst_inds = self.get_burst_inds()
-        self.burst_licks = self.get_burst_licks()
-        self.burst_start = self.get_burst_start()
-        self.burst_end = self.get_burst_end()
-        self.burst_lengths = self.get_burst_lengths()
+        self.burst_bounds = self.get_burst_bounds()
+        self.set_burst_attributes()
 
         if self.min_burst_length > 1:
             self.remove_short_bursts()
@@ -212,15 +244,11 @@ class Lickcalc:
         self.interburst_intervals = self.get_interburstintervals()
         
         # then lick runs
-        self.runs = self.get_runs()
-        self.runs_start = self.get_run_start()
-        self.runs_inds = self.get_run_inds()
-        self.runs_end = self.get_run_end()
-        self.runs_licks = self.get_run_licks()
-        self.runs_length = self.get_run_lengths()
+        self.runs_bounds = self.get_runs_bounds()
+        self.set_run_attributes()
         if self.min_run_length > 1:
             self.remove_short_runs()
-        self.runs_number = len(self.runs)
+        self.runs_number = len(self.runs_inds)
             
         # then burst probability
         self.burst_prob = self.get_burst_probability()
@@ -247,48 +275,16 @@ class Lickcalc:
             return ilis
     
     def get_ilis_in_bursts(self):
-        tmp_burst = []
-        all_rows = []
-        burst_idx = 0
-        diffs = np.diff(self.licks)
-    
-        for idx, ili in enumerate(diffs):
-            if ili < self.burst_threshold:
-                tmp_burst.append(ili)
-            else:
-                # Safe indexing for pre_ili
-                pre_idx = idx - len(tmp_burst) - 1
-                pre_ili = diffs[pre_idx] if pre_idx >= 0 else np.nan
-                
-                df_temp = pd.DataFrame({
-                    "burst_index": burst_idx,
-                    "ili_index": np.arange(len(tmp_burst)),
-                    "ili": tmp_burst,
-                    "pre_ili": pre_ili,
-                    "post_ili": ili
-                })
-                all_rows.append(df_temp)
-                burst_idx += 1
-                tmp_burst = []
-        
-        # Handle final burst if it exists
-        if tmp_burst:
-            pre_idx = len(diffs) - len(tmp_burst) - 1
-            pre_ili = diffs[pre_idx] if pre_idx >= 0 else np.nan
-            df_temp = pd.DataFrame({
-                "burst_index": burst_idx,
-                "ili_index": np.arange(len(tmp_burst)),
-                "ili": tmp_burst,
-                "pre_ili": pre_ili,
-                "post_ili": np.nan
-            })
-            all_rows.append(df_temp)
-        
+        import pandas as pd
+
+        columns = ["burst_index", "ili_index", "ili", "pre_ili", "post_ili"]
+        rows = _kernels.ilis_in_bursts(np.diff(self.licks), self.burst_threshold)
+
         # Handle empty case
-        if not all_rows:
-            self.ilis_in_bursts = pd.DataFrame(columns=["burst_index", "ili_index", "ili", "pre_ili", "post_ili"])
+        if len(rows[0]) == 0:
+            self.ilis_in_bursts = pd.DataFrame(columns=columns)
         else:
-            self.ilis_in_bursts = pd.concat(all_rows, ignore_index=True)
+            self.ilis_in_bursts = pd.DataFrame(dict(zip(columns, rows)))
         
         return self.ilis_in_bursts
 
@@ -312,45 +308,56 @@ class Lickcalc:
     
     def get_intercontact_time(self):
         if self.offset is not None:
-            return np.array(self.licks)[1:] - np.array(self.offset)[:-1]
+            intercontact_time = np.array(self.licks)[1:] - np.array(self.offset)[:-1]
+            return intercontact_time[~np.isnan(intercontact_time)]
         else:
             return None
 
+    def get_burst_bounds(self):
+        return get_segment_bounds(self.licks, self.burst_threshold)
+
+    def set_burst_attributes(self):
+        """Derives the per-burst lists from the start/stop indices in burst_bounds."""
+        self.burst_inds = self.get_burst_inds()
+        self.burst_licks = self.get_burst_licks()
+        self.burst_start = self.get_burst_start()
+        self.burst_end = self.get_burst_end()
+        self.burst_lengths = self.get_burst_lengths()
+
     def get_burst_inds(self):
-        burst_inds = (np.where(np.diff(self.licks) > self.burst_threshold)[0] + 1).tolist()
-        burst_inds = [0] + burst_inds
-        return burst_inds
+        return self.burst_bounds[0].tolist()
     
     def get_burst_licks(self):
-        return np.diff(self.burst_inds + [self.total]).tolist()
+        return (self.burst_bounds[1] - self.burst_bounds[0]).tolist()
     
     def get_burst_start(self):
-        return self.licks[self.burst_inds].tolist()
+        return self.licks[self.burst_bounds[0]].tolist()
     
     def get_burst_end(self):
-        end = self.licks[np.array(self.burst_inds[1:], dtype=int) - 1]
-        return end.tolist() + [self.licks[-1]]
+        return self.licks[self.burst_bounds[1] - 1].tolist()
     
     def get_burst_lengths(self):
-        return [x - y for x, y in zip(self.burst_end, self.burst_start)]
+        return (self.licks[self.burst_bounds[1] - 1] - self.licks[self.burst_bounds[0]]).tolist()
+
+    @property
+    def bursts(self):
+        """List of views into licks, one per burst."""
+        return [self.licks[start:stop] for start, stop in zip(*self.burst_bounds)]
     
     def remove_short_bursts(self):
-        inds_to_keep = [i for i, val in enumerate(self.burst_licks) if val >= self.min_burst_length]
-        for burst_var in ['burst_inds', 'burst_licks', 'burst_start', 'burst_end', 'burst_lengths']:
-            setattr(self, burst_var, [getattr(self, burst_var)[i] for i in inds_to_keep])
+        starts, stops = self.burst_bounds
+        keep = (stops - starts) >= self.min_burst_length
+        self.burst_bounds = (starts[keep], stops[keep])
+        self.set_burst_attributes()
     
     def keep_first_n_bursts(self, n):
         """Keep only the first N bursts. If fewer than N bursts exist, keeps all."""
         if n <= 0:
             return  # Do nothing if n is 0 or negative
         
-        # Determine how many bursts to keep (min of n or total bursts)
-        n_to_keep = min(n, len(self.burst_inds))
-        
-        # Slice all burst-related lists to keep only first n bursts
-        for burst_var in ['burst_inds', 'burst_licks', 'burst_start', 'burst_end', 'burst_lengths']:
-            current_list = getattr(self, burst_var)
-            setattr(self, burst_var, current_list[:n_to_keep])
+        # Slicing past the end keeps all bursts when fewer than n exist
+        self.burst_bounds = (self.burst_bounds[0][:n], self.burst_bounds[1][:n])
+        self.set_burst_attributes()
 
     def get_burst_number(self):
         return len(self.burst_inds)
@@ -383,29 +390,45 @@ class Lickcalc:
         else:
             return np.array(self.burst_start[1:]) - np.array(self.burst_end[:-1])
     
+    def get_runs_bounds(self):
+        return get_segment_bounds(self.licks, self.run_threshold)
+
+    def set_run_attributes(self):
+        """Derives the per-run lists from the start/stop indices in runs_bounds."""
+        self.runs_start = self.get_run_start()
+        self.runs_inds = self.get_run_inds()
+        self.runs_end = self.get_run_end()
+        self.runs_licks = self.get_run_licks()
+        self.runs_length = self.get_run_lengths()
+
     def get_runs(self):
-        split_points = np.where(np.array(np.diff(self.licks)) > self.run_threshold)[0] + 1
-        return np.split(self.licks, split_points)
+        return [self.licks[start:stop] for start, stop in zip(*self.runs_bounds)]
+
+    @property
+    def runs(self):
+        """List of views into licks, one per run."""
+        return self.get_runs()
     
     def get_run_start(self):
-        return [run[0] for run in self.runs]
+        return self.licks[self.runs_bounds[0]].tolist()
     
     def get_run_inds(self):
-        return np.where(np.isin(self.licks, self.runs_start))[0].tolist()
+        return self.runs_bounds[0].tolist()
     
     def get_run_end(self):
-        return [run[-1] for run in self.runs]
+        return self.licks[self.runs_bounds[1] - 1].tolist()
     
     def get_run_licks(self):
-        return [len(run) for run in self.runs]
+        return (self.runs_bounds[1] - self.runs_bounds[0]).tolist()
     
     def get_run_lengths(self):
-        return [run[-1] - run[0] for run in self.runs]
+        return (self.licks[self.runs_bounds[1] - 1] - self.licks[self.runs_bounds[0]]).tolist()
     
     def remove_short_runs(self):
-        inds_to_keep = [i for i, val in enumerate(self.runs_licks) if val >= self.min_run_length]
-        for run_var in ['runs', 'runs_start', 'runs_inds', 'runs_end', 'runs_licks', 'runs_length']:
-            setattr(self, run_var, [getattr(self, run_var)[i] for i in inds_to_keep])
+        starts, stops = self.runs_bounds
+        keep = (stops - starts) >= self.min_run_length
+        self.runs_bounds = (starts[keep], stops[keep])
+        self.set_run_attributes()
 
     def get_burst_probability(self):
         if self.burst_number == 0:
@@ -425,7 +448,182 @@ class Lickcalc:
     def get_histogram(self):
         bins = np.arange(0, len(self.licks), self.binsize)
         return np.histogram(self.licks, bins=bins, density=self.hist_density)[0]
+
+    def rolling(self, window, step, start=0, stop=None, center=True):
+        """
+        Calculates lick microstructure as continuous time series using a sliding window.
+
+        All windows are evaluated at once using cumulative sums and window boundaries
+        found with np.searchsorted, so cost scales with number of licks plus number of
+        time points rather than their product.
+
+        Parameters
+        ----------
+        window : Float
+            Length of sliding window (in seconds).
+        step : Float
+            Time (in seconds) between consecutive points of the output grid. Use 1/fs to
+            get one value per sample of a photometry stream.
+        start : Float, optional
+            Time of first grid point. The default is 0, which aligns the grid with
+            sample 0 of streams used by `Snipper` and `processdata`.
+        stop : Float, optional
+            Time of last grid point. The default is None, which uses the last lick.
+        center : Bool, optional
+            If True, each window is centred on its grid point. If False, windows end at
+            (and include) their grid point, i.e. only use licks up to that time. The default is True.
+
+        Returns
+        -------
+        output, a dictionary with the following keys
+        'time' : 1D array
+            Time of each grid point, start + k * step.
+        'lick_rate' : 1D array
+            Licks per second within each window.
+        'burst_number' : 1D array
+            Number of bursts starting within each window.
+        'burst_mean' : 1D array
+            Mean licks per burst for bursts starting within each window (NaN if none).
+        'intraburst_freq' : 1D array
+            Reciprocal of the mean interlick interval below burst_threshold within each
+            window (NaN if none). Unlike `intraburst_freq` this is based on the mean, not
+            the mode, so that it can be computed from cumulative sums.
+
+        """
+        if stop is None:
+            stop = self.licks[-1] if len(self.licks) > 0 else start
+
+        n_points = max(int(np.floor((stop - start) / step + 1e-9)) + 1, 0)
+        time = start + np.arange(n_points) * step
+
+        # centred windows are [left, right), trailing windows are (left, right] so that
+        # licks at a grid point count towards that point
+        if center:
+            left = time - window / 2
+            side = 'left'
+        else:
+            left = time - window
+            side = 'right'
+        right = left + window
+
+        # licks per window
+        n_licks = np.searchsorted(self.licks, right, side) - np.searchsorted(self.licks, left, side)
+
+        # bursts are assigned to the window containing their first lick
+        burst_start = self.licks[self.burst_bounds[0]]
+        first = np.searchsorted(burst_start, left, side)
+        last = np.searchsorted(burst_start, right, side)
+        n_bursts = last - first
+        burst_licks = _kernels.segment_sums(self.burst_bounds[1] - self.burst_bounds[0], first, last)
+
+        # intraburst ILIs are assigned to the window containing the second lick
+        ilis = np.diff(self.licks)
+        in_burst = ilis < self.burst_threshold
+        ili_time = self.licks[1:][in_burst]
+        first = np.searchsorted(ili_time, left, side)
+        last = np.searchsorted(ili_time, right, side)
+        ili_sum = _kernels.segment_sums(ilis[in_burst], first, last)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            burst_mean = np.where(n_bursts > 0, burst_licks / n_bursts, np.nan)
+            intraburst_freq = np.where(ili_sum > 0, (last - first) / ili_sum, np.nan)
+
+        return {'time': time,
+                'lick_rate': n_licks / window,
+                'burst_number': n_bursts,
+                'burst_mean': burst_mean,
+                'intraburst_freq': intraburst_freq}
     
+def offsets_aligned(licks, offset):
+    """
+    Checks whether offset[i] belongs to licks[i] for every lick, i.e. there are as
+    many offsets as onsets and each offset falls at or after its onset and before the
+    next onset.
+    """
+    licks, offset = np.asarray(licks), np.asarray(offset)
+    if len(licks) != len(offset):
+        return False
+    return bool(np.all(offset >= licks) and np.all(offset[:-1] < licks[1:]))
+
+def pair_licks(licks, offset):
+    """
+    Matches each lick onset to the first offset that follows it, so that dropped
+    onsets or offsets (e.g. missed TTLs) do not shift the pairing of later licks.
+
+    An onset is paired with the first offset at or after it, provided that offset
+    comes before the next onset. Otherwise the onset is left unmatched, as is any
+    offset that is not the first offset after some onset. Uses np.searchsorted so
+    runs in O(n log n) without Python loops.
+
+    Parameters
+    ----------
+    licks : 1D array
+        Lick onset times, sorted in ascending order.
+    offset : 1D array
+        Lick offset times, sorted in ascending order.
+
+    Returns
+    -------
+    pairs, a dictionary with the following keys
+    'offset' : 1D array
+        Offsets aligned with licks, NaN for onsets without an offset.
+    'lick_inds' : 1D array of Ints
+        Indices of onsets that were paired.
+    'offset_inds' : 1D array of Ints
+        Indices of offsets paired with each of lick_inds.
+    'unmatched_licks' : 1D array of Ints
+        Indices of onsets without an offset.
+    'unmatched_offsets' : 1D array of Ints
+        Indices of offsets without an onset.
+
+    """
+    licks = np.asarray(licks, dtype=float)
+    offset = np.asarray(offset, dtype=float)
+
+    candidate = np.searchsorted(offset, licks, side='left')
+    has_offset = candidate < len(offset)
+    candidate_time = offset[np.minimum(candidate, len(offset) - 1)] if len(offset) > 0 else np.full(len(licks), np.inf)
+    next_lick = np.append(licks[1:], np.inf)
+    paired = has_offset & (candidate_time < next_lick)
+
+    lick_inds = np.flatnonzero(paired)
+    offset_inds = candidate[paired]
+
+    aligned = np.full(len(licks), np.nan)
+    aligned[lick_inds] = offset[offset_inds]
+
+    matched_offsets = np.zeros(len(offset), dtype=bool)
+    matched_offsets[offset_inds] = True
+
+    return {'offset': aligned,
+            'lick_inds': lick_inds,
+            'offset_inds': offset_inds,
+            'unmatched_licks': np.flatnonzero(~paired),
+            'unmatched_offsets': np.flatnonzero(~matched_offsets)}
+
+def get_segment_bounds(licks, threshold):
+    """
+    Splits a train of licks into segments (e.g. bursts or runs) wherever the
+    interlick interval exceeds a threshold.
+
+    Parameters
+    ----------
+    licks : 1D array
+        Lick onset times, sorted in ascending order.
+    threshold : Float
+        Interlick interval (in seconds) above which a new segment starts.
+
+    Returns
+    -------
+    starts : 1D array of Ints
+        Index of the first lick in each segment.
+    stops : 1D array of Ints
+        Index one past the last lick in each segment, so that
+        licks[starts[i]:stops[i]] is a view of segment i.
+
+    """
+    return _kernels.segment_bounds(licks, threshold)
+
 def calculate_burst_prob(bursts):
     """
     Calculates cumulative burst probability as in seminal Davis paper
@@ -433,26 +631,93 @@ def calculate_burst_prob(bursts):
 
     Parameters
     ----------
-    bursts : List
-        List with lengths of bursts.
+    bursts : List or 1D array of Ints
+        Number of licks in each burst.
 
     Returns
     -------
-    x : List
-        x values (bin sizes).
-    y : List
-        y values of cumulative burst probability.
+    x : 1D array
+        x values (burst sizes).
+    y : 1D array
+        y values of cumulative burst probability, i.e. proportion of bursts
+        larger than x.
 
     """
-    bins = np.arange(min(bursts), max(bursts))
-    hist=np.histogram(bursts, bins=bins, density=True)
-    cumsum=np.cumsum(hist[0])
-
-    x = hist[1][1:]
-    y = [1-val for val in cumsum]
+    bursts = np.asarray(bursts).astype(int)
+    lo, hi = bursts.min(), bursts.max()
+    n_bins = hi - lo - 1
+    if n_bins < 1:
+        return np.array([], dtype=int), np.array([])
+
+    # counts of each size from lo to hi-1, with hi-1 sharing the last bin with hi-2 and
+    # bursts of size hi left out, as with np.histogram on bins of np.arange(lo, hi)
+    counts = np.bincount(bursts - lo)[:hi - lo]
+    counts[-2] += counts[-1]
+    counts = counts[:n_bins]
+
+    x = np.arange(lo + 1, hi)
+    y = 1 - np.cumsum(counts / counts.sum())
     
     return x, y
 
+def calculate_burst_prob_batch(bursts_per_session):
+    """
+    Calculates cumulative burst probability curves for many sessions at once.
+
+    Curves are returned as padded 2D arrays (one row per session) so that they can be
+    passed to batched fitting routines. Each row is identical to the output of
+    `calculate_burst_prob` for that session, followed by NaN padding.
+
+    Parameters
+    ----------
+    bursts_per_session : List of lists or 1D arrays of Ints
+        Number of licks in each burst, for each session.
+
+    Returns
+    -------
+    x : 2D array
+        x values (burst sizes), NaN padded.
+    y : 2D array
+        y values of cumulative burst probability, NaN padded.
+    lengths : 1D array of Ints
+        Number of valid points in each row.
+
+    """
+    n_sessions = len(bursts_per_session)
+    sizes = [np.asarray(b).astype(int) for b in bursts_per_session]
+    n_per_session = np.array([len(b) for b in sizes])
+    session_id = np.repeat(np.arange(n_sessions), n_per_session)
+    all_sizes = np.concatenate(sizes) if n_sessions > 0 else np.array([], dtype=int)
+
+    lo = np.zeros(n_sessions, dtype=int)
+    hi = np.zeros(n_sessions, dtype=int)
+    has_bursts = n_per_session > 0
+    if np.any(has_bursts):
+        starts = np.concatenate(([0], np.cumsum(n_per_session)[:-1]))[has_bursts]
+        lo[has_bursts] = np.minimum.reduceat(all_sizes, starts)
+        hi[has_bursts] = np.maximum.reduceat(all_sizes, starts)
+    lengths = np.maximum(hi - lo - 1, 0)
+
+    width = max(int(np.max(hi - lo, initial=0)), 1)
+    counts = np.bincount(session_id * (width + 1) + (all_sizes - lo[session_id]),
+                         minlength=n_sessions * (width + 1)).reshape(n_sessions, width + 1).astype(float)
+
+    # merge size hi-1 into the last bin and drop bins beyond it, as in calculate_burst_prob
+    rows = np.flatnonzero(lengths > 0)
+    counts[rows, lengths[rows] - 1] += counts[rows, lengths[rows]]
+    cols = np.arange(width + 1)
+    valid = cols[None, :] < lengths[:, None]
+    counts[~valid] = 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = 1 - np.cumsum(counts, axis=1) / counts.sum(axis=1, keepdims=True)
+    x = (lo[:, None] + 1 + cols[None, :]).astype(float)
+    x[~valid] = np.nan
+    y[~valid] = np.nan
+
+    max_length = int(np.max(lengths, initial=0))
+    return x[:, :max_length], y[:, :max_length], lengths
+
 def weib_davis(x, alpha, beta):
     '''Weibull function as used in Davis (1998) DOI: 10.1152/ajpregu.1996.270.4.R793'''
     try:
@@ -478,6 +743,9 @@ def weib_davis(x, alpha, beta):
 
 def fit_weibull(xdata, ydata):
     '''Fits Weibull function to xdata and ydata and returns fit parameters.'''
+    import scipy.optimize as opt
+    from scipy import stats
+
     x0=np.array([0.1, 1])
     fit=opt.curve_fit(weib_davis, xdata, ydata, x0)
     alpha=fit[0][0]
@@ -491,8 +759,14 @@ def get_mode(data, binsize=0.001, smooth_window=20):
     if data is None or len(data) == 0:
         return None
     hist = np.histogram(data, bins=np.arange(0, np.max(data) + binsize, binsize))
-    hist_smoothed = pd.Series(hist[0]).rolling(smooth_window, center=True).mean()
-    return hist_smoothed.idxmax() * binsize
+    if len(hist[0]) < smooth_window:
+        return None
+
+    # centred rolling mean of counts (same as pandas rolling(smooth_window, center=True)),
+    # where window_sums[j] is the window centred on bin j + smooth_window // 2
+    cumsum = np.concatenate(([0], np.cumsum(hist[0])))
+    window_sums = cumsum[smooth_window:] - cumsum[:-smooth_window]
+    return (np.argmax(window_sums) + smooth_window // 2) * binsize
 
     # need to test with different files and times when zero licks are given etc
         # and when licks are gtiven but no bursts
@@ -500,7 +774,8 @@ def get_mode(data, binsize=0.001, smooth_window=20):
 
 # idea to add for some of these calculator functions optional arguments that allow one to specify subsets of data
 # to make it easier to for example do calculations of each quarter of a session - by licks, or by time
-# or to do calculations for different types of licks (e.g. licks during reward vs licks during non-reward)
+# (now done by time_divisions/burst_divisions in lickcalc) or to do calculations for different types of
+# licks, e.g. licks during reward vs licks during non-reward (now done by lick_utils.lickcalc_subsets)
 
 
 
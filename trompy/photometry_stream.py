@@ -0,0 +1,153 @@
+"""
+Chunk-by-chunk isosbestic correction of photometry signals.
+"""
+import numpy as np
+import scipy.signal as sig
+from trompy.filter_utils import design_filter
+from trompy.snipper_utils import _fit_from_sums
+
+
+class StreamingCorrector:
+    """
+    Corrects a photometry signal for the isosbestic channel one chunk at a time.
+
+    Useful while data are being acquired or when recordings are too large to load at
+    once. Uses the Lerner/Davidson approach of processdata: the signal is regressed on
+    the isosbestic and expressed as percentage change from the fitted isosbestic. The
+    regression is updated from running sums of every sample seen so far, an optional
+    low-pass filter carries its state between chunks, and z-scoring uses a running
+    mean and SD. Each chunk is returned as soon as it is processed and memory use does
+    not grow with recording length.
+
+    Because fits and normalisation only use data seen so far, early chunks differ from
+    the result of processdata on the whole recording and converge to it over time.
+
+    Parameters
+    ----------
+    fs : Float
+        Sampling frequency.
+    lowpass : Float, optional
+        Cutoff (in Hz) of a causal Butterworth low-pass filter applied to both streams
+        before fitting. The default is None (no filtering).
+    filter_order : Int, optional
+        Order of low-pass filter. The default is 4.
+    normalize : Bool, optional
+        Converts output to running z-scores. The default is True.
+
+    Examples
+    --------
+    >>> corrector = StreamingCorrector(fs=1017, lowpass=10)
+    >>> for blue, uv in acquisition:
+    ...     corrected = corrector.process(blue, uv)
+    """
+    def __init__(self, fs, lowpass=None, filter_order=4, normalize=True):
+        self.fs = fs
+        self.lowpass = lowpass
+        self.filter_order = filter_order
+        self.normalize = normalize
+
+        self.sos = None
+        if lowpass is not None:
+            self.sos = design_filter(filter_order, lowpass, fs=fs)
+
+        self.reset()
+
+    def reset(self):
+        """Forgets all data seen so far."""
+        self.n = 0
+        # means and centred sums of squares and products of isosbestic (x) and signal (y),
+        # merged chunk by chunk so precision is not lost when signals sit far from zero
+        self.mean_x = self.mean_y = self.cxx = self.cxy = 0.0
+        # running mean and sum of squared deviations of corrected signal
+        self.mean = self.m2 = 0.0
+        self.n_normalized = 0
+        self._zi = None
+
+    def _fit(self):
+        # centred sums give the slope directly, and the line passes through the means
+        slope = _fit_from_sums(self.n, 0.0, 0.0, self.cxx, self.cxy)[0]
+        return slope, self.mean_y - slope*self.mean_x
+
+    @property
+    def slope(self):
+        return self._fit()[0]
+
+    @property
+    def intercept(self):
+        return self._fit()[1]
+
+    @property
+    def sd(self):
+        return np.sqrt(self.m2 / self.n_normalized) if self.n_normalized > 0 else np.nan
+
+    def _filter(self, signal, isosbestic):
+        if self.sos is None:
+            return signal, isosbestic
+        if self._zi is None:
+            # start filter at steady state for first samples to avoid a step response
+            zi = sig.sosfilt_zi(self.sos)
+            self._zi = [zi * signal[0], zi * isosbestic[0]]
+        signal, self._zi[0] = sig.sosfilt(self.sos, signal, zi=self._zi[0])
+        isosbestic, self._zi[1] = sig.sosfilt(self.sos, isosbestic, zi=self._zi[1])
+        return signal, isosbestic
+
+    def process(self, signal, isosbestic):
+        """
+        Corrects a chunk of data.
+
+        Parameters
+        ----------
+        signal : List or 1D array of Floats
+            Chunk of primary data stream (Ca-modulated).
+        isosbestic : List or 1D array of Floats
+            Chunk of secondary data stream (non-Ca modulated), same length as signal.
+
+        Returns
+        -------
+        df : 1D array of Floats
+            Corrected chunk, same length as input.
+
+        """
+        signal = np.asarray(signal, dtype=np.float64)
+        isosbestic = np.asarray(isosbestic, dtype=np.float64)
+        if len(signal) != len(isosbestic):
+            raise ValueError("signal and isosbestic chunks must be the same length.")
+        if len(signal) == 0:
+            return np.empty(0)
+
+        y, x = self._filter(signal, isosbestic)
+
+        # Chan et al. merge of this chunk's means and co-moments with those so far
+        chunk_n = len(x)
+        chunk_mean_x, chunk_mean_y = np.mean(x), np.mean(y)
+        dx, dy = x - chunk_mean_x, y - chunk_mean_y
+        delta_x, delta_y = chunk_mean_x - self.mean_x, chunk_mean_y - self.mean_y
+        total = self.n + chunk_n
+        self.cxx += np.dot(dx, dx) + delta_x**2 * self.n * chunk_n / total
+        self.cxy += np.dot(dx, dy) + delta_x*delta_y * self.n * chunk_n / total
+        self.mean_x += delta_x * chunk_n / total
+        self.mean_y += delta_y * chunk_n / total
+        self.n = total
+        slope, intercept = self._fit()
+
+        fit = slope*x + intercept
+        df = y - fit
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df /= fit
+        df *= 100
+
+        if self.normalize:
+            # Chan et al. update of running mean and variance with this chunk
+            chunk_n = len(df)
+            chunk_mean = np.mean(df)
+            delta = chunk_mean - self.mean
+            total = self.n_normalized + chunk_n
+            self.mean += delta * chunk_n / total
+            self.m2 += np.sum((df - chunk_mean)**2) + delta**2 * self.n_normalized * chunk_n / total
+            self.n_normalized = total
+
+            df -= self.mean
+            if self.sd > 0:
+                df /= self.sd
+
+        return df
@@ -0,0 +1,190 @@
+"""
+Snips of different lengths stored as one NaN-padded array plus their lengths.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from trompy.snipper_utils import _bin_edges, _reduce_bins
+
+
+class RaggedSnips:
+    """
+    Snips of different lengths, e.g. from Snipper when event ends are given.
+
+    Snips are stored as rows of one 2D array padded with NaN at the end, together with
+    the length of each snip, so baseline adjustment, binning, z-scoring, truncation and
+    averaging are array operations rather than loops over snips. Indexing with an
+    integer or iterating gives each snip at its own length.
+
+    Parameters
+    ----------
+    values : 2D array of Floats
+        Snips as rows, padded at the end.
+    lengths : List or 1D array of Ints
+        Length of each snip.
+
+    Examples
+    --------
+    >>> snips = RaggedSnips.from_windows(data, starts, stops)
+    >>> snips.adjust_baseline(100).bin(10)
+    >>> average = snips.mean(axis=0)
+    """
+    def __init__(self, values, lengths):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        if self.values.ndim != 2 or len(self.values) != len(self.lengths):
+            raise ValueError("values must be a 2D array with one row per length.")
+
+    @classmethod
+    def from_list(cls, snips):
+        """Makes RaggedSnips from a list or object array of 1D snips."""
+        lengths = np.array([len(snip) for snip in snips], dtype=np.int64)
+        values = np.full([len(lengths), lengths.max() if len(lengths) else 0], np.nan)
+        if len(lengths):
+            values[cls._mask(lengths, values.shape[1])] = np.concatenate(
+                [np.asarray(snip, dtype=np.float64) for snip in snips])
+        return cls(values, lengths)
+
+    @classmethod
+    def from_windows(cls, data, starts, stops):
+        """Makes RaggedSnips of data[start:stop] for each start and stop, in a single gather."""
+        data = np.asarray(data)
+        starts = np.clip(np.asarray(starts, dtype=np.int64), 0, len(data))
+        stops = np.clip(np.asarray(stops, dtype=np.int64), starts, len(data))
+        lengths = stops - starts
+
+        width = lengths.max() if len(lengths) else 0
+        values = np.empty([len(lengths), width])
+        if width:
+            # copy a full-width window per snip from a strided view of data, so only
+            # the samples in windows are read (e.g. from a memory-mapped stream)
+            inside = starts + width <= len(data)
+            values[inside] = sliding_window_view(data, width)[starts[inside]]
+            # windows running past the end of data repeat its last sample, which is
+            # then blanked with the rest of the padding
+            end_idx = np.minimum(starts[~inside, np.newaxis] + np.arange(width), len(data) - 1)
+            values[~inside] = data[end_idx]
+        np.copyto(values, np.nan, where=~cls._mask(lengths, width))
+        return cls(values, lengths)
+
+    @staticmethod
+    def _mask(lengths, width):
+        return np.arange(width) < lengths[:, np.newaxis]
+
+    @property
+    def mask(self):
+        """Boolean array that is True where values hold data rather than padding."""
+        return self._mask(self.lengths, self.values.shape[1])
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __repr__(self):
+        return f"RaggedSnips(nsnips={len(self)}, max_length={self.values.shape[1]})"
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):
+            return self.values[idx, :self.lengths[idx]]
+        return RaggedSnips(self.values[idx], self.lengths[idx])
+
+    def __iter__(self):
+        for row, length in zip(self.values, self.lengths):
+            yield row[:length]
+
+    def to_object_array(self):
+        """Returns snips as an object array of 1D arrays, as made by Snipper.longsnipper."""
+        snips = np.empty(len(self), dtype=object)
+        for idx, snip in enumerate(self):
+            snips[idx] = snip
+        return snips
+
+    def _baseline_stats(self, baseline_points):
+        baseline = self.values[:, :baseline_points]
+        if len(self) and self.lengths.min() >= baseline.shape[1]:
+            # every snip covers the whole baseline, so there is no padding to skip
+            return baseline.mean(axis=1), baseline.std(axis=1)
+        mask = self._mask(self.lengths, baseline.shape[1])
+        n = mask.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(mask, baseline, 0).sum(axis=1) / n
+            sd = np.sqrt(np.where(mask, (baseline - mean[:, np.newaxis])**2, 0).sum(axis=1) / n)
+        return mean, sd
+
+    def _make_writeable(self):
+        # e.g. snips memory-mapped read-only by Snipper.load are copied into memory once
+        if not self.values.flags.writeable:
+            self.values = np.array(self.values)
+
+    def adjust_baseline(self, baseline_points):
+        """Subtracts mean of first baseline_points of each snip, in place."""
+        self._make_writeable()
+        mean, _ = self._baseline_stats(baseline_points)
+        self.values -= mean[:, np.newaxis]
+        return self
+
+    def zscore(self, baseline_points):
+        """Z-scores each snip using its first baseline_points, in place. Zero SD gives NaN."""
+        self._make_writeable()
+        mean, sd = self._baseline_stats(baseline_points)
+        sd[sd == 0] = np.nan
+        self.values -= mean[:, np.newaxis]
+        self.values /= sd[:, np.newaxis]
+        return self
+
+    def bin(self, samples_per_bin, method='mean'):
+        """
+        Bins every snip into ceil(length / samples_per_bin) bins, as snipper_utils.bin_snips.
+
+        All snips are binned in one reduceat over their concatenated values, so bin
+        edges fall at multiples of samples_per_bin (rounded down) and a NaN in the data
+        only affects its own bin. method is 'mean', 'sum' or 'max'.
+        """
+        n_bins, starts, stops = _bin_edges(self.lengths, samples_per_bin)
+        width = self.values.shape[1]
+        offsets = np.repeat(np.arange(len(self)) * width, n_bins)
+        starts, stops = starts + offsets, stops + offsets
+
+        # reduce over the padded rows directly, with an extra bin over the padding after
+        # each shorter snip that is then discarded
+        padding = np.flatnonzero(self.lengths < width)
+        at = np.cumsum(n_bins)[padding]
+        all_starts = np.insert(starts, at, padding * width + self.lengths[padding])
+        all_stops = np.insert(stops, at, (padding + 1) * width)
+        is_bin = np.insert(np.ones(len(starts), dtype=bool), at, False)
+        flat = _reduce_bins(self.values.reshape(-1), all_starts, all_stops, method)[is_bin]
+
+        binned = np.full([len(self), n_bins.max() if len(self) else 0], np.nan)
+        binned[self._mask(n_bins, binned.shape[1])] = flat
+        return RaggedSnips(binned, n_bins)
+
+    def truncate(self, n_start, n_end):
+        """
+        Returns 2D array of the first n_start and last n_end values of every snip.
+
+        For snips shorter than n_start + n_end, values are not repeated: positions in
+        the last n_end that are also in the first n_start, or before the start of the
+        snip, are NaN, as are positions in the first n_start past the end of the snip.
+        """
+        end_idx = self.lengths[:, np.newaxis] - n_end + np.arange(n_end)
+        end = np.take_along_axis(self.values, np.clip(end_idx, 0, None), axis=1)
+        return np.hstack((self.values[:, :n_start], np.where(end_idx >= n_start, end, np.nan)))
+
+    def _reduce(self, axis, func):
+        if axis is None:
+            return func(self.values[self.mask])
+        if axis in (0, -2):
+            masked = np.ma.masked_array(self.values, mask=~self.mask)
+            return np.ma.filled(func(masked, axis=0), np.nan)
+        raise ValueError(f"axis {axis} is out of bounds for RaggedSnips with 2 dimensions.")
+
+    def mean(self, axis=None, **kwargs):
+        """Mean of snips. With axis=0, each point is averaged over snips long enough to have it."""
+        if axis in (1, -1):
+            return self._baseline_stats(self.values.shape[1])[0]
+        return self._reduce(axis, np.mean)
+
+    def std(self, axis=None, ddof=0, **kwargs):
+        """Standard deviation of snips, with axis as for mean."""
+        if axis in (1, -1):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return self._baseline_stats(self.values.shape[1])[1] * np.sqrt(self.lengths / (self.lengths - ddof))
+        return self._reduce(axis, lambda values, axis=None: np.std(values, axis=axis, ddof=ddof))
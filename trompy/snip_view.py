@@ -0,0 +1,168 @@
+"""
+Read-only snips that are views of the original data stream rather than copies.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Default number of bytes of snips materialised at once when reducing
+_CHUNK_BYTES = 2**25
+
+
+class SnipView:
+    """
+    Snips of equal length held as start indices into a strided view of a data stream.
+
+    No snip is copied when the view is made. Indexing with an integer returns a
+    read-only view of that snip, and indexing with a slice, list or boolean mask
+    returns another SnipView. Reductions (sum, mean, std) work through the snips in
+    chunks so peri-event averages can be computed without making the full
+    n_snips x trial_length array. Use copy (or np.asarray) to get an ordinary array
+    that can be written to.
+
+    Parameters
+    ----------
+    data : 1D array
+        Data stream that snips are taken from. It is not copied so should not be
+        changed while the view is in use.
+    starts : List or 1D array of Ints
+        Sample index at which each snip starts.
+    length : Int
+        Number of samples in each snip.
+    chunk_size : Int, optional
+        Number of snips materialised at once during reductions. The default is None,
+        which uses chunks of about 32 MB.
+
+    Examples
+    --------
+    >>> snips, fs = snipper(data, licks, fs=fs, adjust_baseline=False, view=True)
+    >>> average = snips.mean(axis=0)
+    >>> first_ten = snips[:10].copy()
+    """
+    def __init__(self, data, starts, length, chunk_size=None):
+        self.data = np.asarray(data)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.length = int(length)
+        if chunk_size is None:
+            chunk_size = _CHUNK_BYTES // max(self.length * self.data.itemsize, 1)
+        self.chunk_size = max(int(chunk_size), 1)
+
+        if len(self.starts) > 0 and (self.starts.min() < 0 or self.starts.max() + self.length > len(self.data)):
+            raise ValueError("All snips must lie inside data.")
+
+        # sliding_window_view is read-only, so snips can never write back to data
+        self._windows = sliding_window_view(self.data, self.length) if self.length <= len(self.data) else None
+
+    @property
+    def shape(self):
+        return (len(self.starts), self.length)
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def size(self):
+        return len(self.starts) * self.length
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __repr__(self):
+        return f"SnipView(nsnips={len(self)}, length={self.length}, dtype={self.dtype})"
+
+    def __getitem__(self, idx):
+        if isinstance(idx, tuple):
+            rows = self[idx[0]]
+            if isinstance(rows, SnipView):
+                return rows.copy()[(slice(None),) + idx[1:]]
+            return rows[idx[1:]]
+        if isinstance(idx, (int, np.integer)):
+            return self._windows[self.starts[idx]]
+        return SnipView(self.data, self.starts[idx], self.length, self.chunk_size)
+
+    def __iter__(self):
+        for start in self.starts:
+            yield self._windows[start]
+
+    def __array__(self, dtype=None, copy=None):
+        snips = self.copy()
+        return snips if dtype is None else snips.astype(dtype, copy=False)
+
+    def copy(self):
+        """Returns all snips as a new (writeable) 2D array."""
+        if len(self.starts) == 0:
+            return np.empty(self.shape, dtype=self.dtype)
+        return self._windows[self.starts]
+
+    def _chunks(self):
+        for idx in range(0, len(self.starts), self.chunk_size):
+            yield self._windows[self.starts[idx : idx + self.chunk_size]]
+
+    def _moments(self, axis):
+        """Count, mean and sum of squared deviations, combined across chunks (Chan et al.)."""
+        if axis == 1:
+            chunks = [(self.length, c.mean(axis=1), c.var(axis=1) * self.length) for c in self._chunks()]
+            if not chunks:
+                return 0, np.empty(0), np.empty(0)
+            return (self.length, np.concatenate([c[1] for c in chunks]),
+                    np.concatenate([c[2] for c in chunks]))
+
+        shape = () if axis is None else (self.length,)
+        n, mean, m2 = 0, np.zeros(shape), np.zeros(shape)
+        for chunk in self._chunks():
+            chunk_n = chunk.size if axis is None else len(chunk)
+            chunk_mean = chunk.mean(axis=axis)
+            chunk_m2 = chunk.var(axis=axis) * chunk_n
+            delta = chunk_mean - mean
+            total = n + chunk_n
+            mean = mean + delta * chunk_n / total
+            m2 = m2 + chunk_m2 + delta**2 * n * chunk_n / total
+            n = total
+        if n == 0:
+            mean = np.full(shape, np.nan)
+        return n, mean, m2
+
+    @staticmethod
+    def _check_axis(axis):
+        if axis not in (None, 0, 1, -1, -2):
+            raise ValueError(f"axis {axis} is out of bounds for SnipView with 2 dimensions.")
+        return {-1: 1, -2: 0}.get(axis, axis)
+
+    @staticmethod
+    def _output(result, dtype, out):
+        if dtype is not None:
+            result = np.asarray(result).astype(dtype)
+        if out is not None:
+            out[...] = result
+            return out
+        return result
+
+    def sum(self, axis=None, dtype=None, out=None):
+        """Sum of snips, as for ndarray.sum."""
+        axis = self._check_axis(axis)
+        if axis == 1:
+            result = np.concatenate([c.sum(axis=1) for c in self._chunks()] or [np.zeros(0)])
+        else:
+            result = sum((c.sum(axis=axis) for c in self._chunks()), np.zeros(() if axis is None else self.length))
+        return self._output(result, dtype, out)
+
+    def mean(self, axis=None, dtype=None, out=None):
+        """Mean of snips, as for ndarray.mean."""
+        axis = self._check_axis(axis)
+        count = {None: self.size, 0: len(self), 1: self.length}[axis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._output(self.sum(axis=axis) / count, dtype, out)
+
+    def var(self, axis=None, dtype=None, out=None, ddof=0):
+        """Variance of snips, as for ndarray.var."""
+        n, _, m2 = self._moments(self._check_axis(axis))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._output(m2 / (n - ddof), dtype, out)
+
+    def std(self, axis=None, dtype=None, out=None, ddof=0):
+        """Standard deviation of snips, as for ndarray.std."""
+        return self._output(np.sqrt(self.var(axis=axis, ddof=ddof)), dtype, out)
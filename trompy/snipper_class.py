@@ -2,14 +2,50 @@ from pathlib import Path
 import numpy as np
 from math import ceil, floor
 import pickle
+import json
 import matplotlib.pyplot as plt
 from trompy.lick_utils import lickcalc
-from trompy.snipper_utils import findnoise, makerandomevents, med_abs_dev
+from trompy.filter_utils import filter_data
+from trompy.ragged_snips import RaggedSnips
+from trompy.snipper_utils import bin_snips, cached_background, findnoise, get_windows, load_stream, makerandomevents, med_abs_dev, zscore, _zscore_rows
+
+# Version of directory layout written by Snipper.save
+_SAVE_VERSION = 1
+
+def _to_json(value):
+    """Converts numpy values in Snipper settings for json.dump."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} cannot be saved in meta.json.")
+
+def _artifact_stats(snips):
+    """Sum of absolute values, SD and maximum absolute difference of every snip, as arrays."""
+    if not isinstance(snips, RaggedSnips):
+        try:
+            snips = np.atleast_2d(np.asarray(snips, dtype=np.float64))
+        except ValueError:
+            # snips of different lengths
+            snips = RaggedSnips.from_list(snips)
+
+    if isinstance(snips, RaggedSnips):
+        mask = snips.mask
+        return {'sum': np.sum(np.abs(snips.values), axis=1, where=mask),
+                'sd': snips.std(axis=1),
+                'diff': np.max(np.abs(np.diff(snips.values, axis=1)), axis=1,
+                               where=mask[:, 1:], initial=-np.inf)}
+
+    return {'sum': np.sum(np.abs(snips), axis=1),
+            'sd': np.std(snips, axis=1),
+            'diff': np.max(np.abs(np.diff(snips, axis=1)), axis=1, initial=-np.inf)}
 
 class Snipper:
     def __init__(self, data, start, **kwargs):
-        self.data = data
-        self.start = np.array([i for i in start if np.isfinite(i)])
+        # paths are memory-mapped so only the samples in each snip are read from disk
+        self.data = load_stream(data, dtype=kwargs.get('dtype', None), offset=kwargs.get('offset', 0))
+        start = np.asarray(start, dtype=float)
+        self.start = start[np.isfinite(start)]
         self.kwargs = kwargs
 
         self.end = kwargs.get('end', None)
@@ -30,28 +66,26 @@ class Snipper:
 
     def get_snips(self):
         
-        self.events_in_samples = [int(timestamp*self.fs) for timestamp in self.start]
+        self.events_in_samples = (self.start * self.fs).astype(np.int64)
 
         if self.end:
             self.end = np.array([i for i in self.end if np.isfinite(i)])
-            self.event_end_in_samples = [int(timestamp*self.fs) for timestamp in self.end]
+            self.event_end_in_samples = (self.end * self.fs).astype(np.int64)
             self.longsnipper()
         else:
             self.trial_length_in_samples = int((self.pre + self.post) * self.fs)
 
             # removes events where an entire snip cannot be made
-            self.events_in_samples = [event for event in self.events_in_samples if \
-                (event - (self.pre * self.fs) > 0) and \
-                (event + (self.post * self.fs) < len(self.data))]
+            self.events_in_samples = self.events_in_samples[
+                (self.events_in_samples - (self.pre * self.fs) > 0) &
+                (self.events_in_samples + (self.post * self.fs) < len(self.data))]
 
             self.nsnips = len(self.events_in_samples)
-            self.snips = np.empty([self.nsnips, self.trial_length_in_samples])
         
-            self.trial_start = [event - ceil(self.pre * self.fs) for event in self.events_in_samples]
-            self.trial_end = [event + ceil(self.post * self.fs) for event in self.events_in_samples]
+            self.trial_start = self.events_in_samples - ceil(self.pre * self.fs)
+            self.trial_end = self.events_in_samples + ceil(self.post * self.fs)
 
-            for idx, timestamp in enumerate(self.trial_start):
-                self.snips[idx] = self.data[timestamp : timestamp + self.trial_length_in_samples]
+            self.snips = get_windows(self.data, self.trial_start, self.trial_length_in_samples)
 
         if self.truncate:
             self.truncate_to_same_length()
@@ -76,25 +110,23 @@ class Snipper:
     
     def longsnipper(self):
         self.nsnips = len(self.events_in_samples)
-        self.snips = []
-        for start, stop in zip(self.events_in_samples, self.event_end_in_samples):
-            self.snips.append(self.data[start - int(self.pre * self.fs) : stop + int(self.post * self.fs)])
-            
-        self.snips = np.array(self.snips, dtype=object)
+        self.snips = RaggedSnips.from_windows(self.data,
+                                              self.events_in_samples - int(self.pre * self.fs),
+                                              self.event_end_in_samples + int(self.post * self.fs))
             
     def truncate_to_same_length(self, cols_to_add=2, mineventlength=6, eventbalance=None):
         # test if snips are already the same length here and exit
         
         self.mineventlength = mineventlength
-        if type(self.snips) == list:
-            self.snips = np.array(self.snips)
+        if not isinstance(self.snips, RaggedSnips):
+            self.snips = RaggedSnips.from_list(self.snips)
         self.snips = self.snips[np.where(self.end - self.start > self.mineventlength)]
         
         if getattr(self, 'noiseindex', None) is not None:
             self.noiseindex = self.noiseindex[np.where(self.end - self.start > self.mineventlength)]
         
         self.bins_per_trial = int((self.mineventlength + self.pre + self.post) / self.binlength)
-        self.truncated_array = np.empty([len(self.snips), self.bins_per_trial])
+        self.truncated_array = np.full([len(self.snips), self.bins_per_trial], np.nan)
         # self.bins_per_section = int(self.bins_per_trial/2)
         try:
             assert(eventbalance[0] + eventbalance[1] == mineventlength)
@@ -108,9 +140,9 @@ class Snipper:
         self.bins_early = int((self.pre + early_t) / self.binlength)
         self.bins_late = int((self.post + late_t) / self.binlength)
         
-        for idx, snip in enumerate(self.snips):
-            self.truncated_array[idx,:self.bins_early] = snip[:self.bins_early]
-            self.truncated_array[idx,-self.bins_late:] = snip[-self.bins_late:]
+        early_and_late = self.snips.truncate(self.bins_early, self.bins_late)
+        self.truncated_array[:,:self.bins_early] = early_and_late[:,:self.bins_early]
+        self.truncated_array[:,-self.bins_late:] = early_and_late[:,self.bins_early:]
 
         self.snips = self.truncated_array
         
@@ -120,30 +152,34 @@ class Snipper:
             padding = np.zeros([len(self.snips), cols_to_add])
             self.snips = np.hstack((left, padding, right))
 
-    def find_potential_artifacts(self, threshold=10, method="sum", showplot=False, remove=True, rolling_window=None):
+    def find_potential_artifacts(self, threshold=10, method="sum", showplot=False, remove=True, rolling_window=None,
+                                 lowpass=None):
         
         if method == "absolute_diff":
             if rolling_window != None:
                 snips_to_use = [np.convolve(snip, np.ones(rolling_window)/rolling_window, mode='valid') for snip in self.snips]
+                diffs = _artifact_stats(snips_to_use)['diff']
+            elif lowpass != None:
+                # smooths with a cached low-pass design (cutoff in Hz) before taking differences
+                snip_fs = 1 / self.binlength if self.binned else self.fs
+                if isinstance(self.snips, RaggedSnips) or np.ndim(self.snips) == 1:
+                    # snips of different lengths are filtered one at a time so padding is not filtered
+                    snips_to_use = [filter_data(np.asarray(snip, dtype=np.float64), lowpass, fs=snip_fs)
+                                    for snip in self.snips]
+                else:
+                    snips_to_use = filter_data(np.asarray(self.snips, dtype=np.float64), lowpass, fs=snip_fs, axis=1)
+                diffs = _artifact_stats(snips_to_use)['diff']
             else:
-                snips_to_use = self.snips
-                
-            self.noiseindex = np.array([np.max(np.abs(np.diff(i))) > threshold for i in snips_to_use])
-        else:       
-            randomevents = makerandomevents(120, int(len(self.data)/self.fs)-120)
-            randomsnips = Snipper(self.data, randomevents, fs=self.fs, pre=self.pre, post=self.post, adjustbaseline=False, binlength=self.binlength).snips
-
-            self.get_MAD(randomsnips, method=method)
-            if method == 'sum':
-                sig_to_compare = [np.sum(abs(i)) for i in self.snips]
+                diffs = self._snip_stats()['diff']
                 
-            elif method == 'sd':
-                sig_to_compare = [np.std(i) for i in self.snips]
-            
-            elif method == 'diff':
-                sig_to_compare = [np.max(np.abs(np.diff(i))) for i in self.snips]
-
-            self.noiseindex = np.array([i > self.bgMAD * threshold for i in sig_to_compare])
+            self.noiseindex = diffs > threshold
+        elif method in ('sum', 'sd', 'diff'):
+            # background MADs are cached on the recording and snip statistics on the
+            # current snips, so scanning thresholds or methods only compares arrays
+            self.bgMAD = self.background_MAD()[method]
+            self.noiseindex = self._snip_stats()[method] > self.bgMAD * threshold
+        else:
+            raise ValueError("method must be 'sum', 'sd', 'diff' or 'absolute_diff'.")
             
         print(f"Found {np.sum(self.noiseindex)} potential artifacts.")
         
@@ -163,21 +199,35 @@ class Snipper:
             return
         
         if np.sum(self.noiseindex) > 0:
-            self.snips = np.array([self.snips[i] for i in range(len(self.snips)) if not self.noiseindex[i]])
+            if isinstance(self.snips, RaggedSnips):
+                self.snips = self.snips[~np.asarray(self.noiseindex, dtype=bool)]
+            else:
+                self.snips = np.array([self.snips[i] for i in range(len(self.snips)) if not self.noiseindex[i]])
         else:
             print("No artifacts found.")
             
     def get_MAD(self, snips, method="sd"):
-        
-        if method == 'sum':
-            bgSum = [np.sum(abs(i)) for i in snips]
-            self.bgMAD = med_abs_dev(bgSum)
-        elif method == 'sd':
-            bgSD = [np.std(i) for i in snips]
-            self.bgMAD = med_abs_dev(bgSD)
-        elif method == 'diff':
-            bgDiff = [np.max(np.abs(np.diff(i))) for i in snips]
-            self.bgMAD = med_abs_dev(bgDiff)
+        self.bgMAD = med_abs_dev(_artifact_stats(snips)[method])
+
+    def background_MAD(self):
+        # MAD of sum, SD and max absolute difference of snips at pseudorandom times,
+        # calculated once per recording and snip settings (see clear_background_cache)
+        def compute():
+            randomevents = makerandomevents(120, int(len(self.data)/self.fs)-120)
+            randomsnips = Snipper(self.data, randomevents, fs=self.fs, pre=self.pre, post=self.post,
+                                  adjustbaseline=False, binlength=self.binlength).snips
+            return {method: med_abs_dev(values) for method, values in _artifact_stats(randomsnips).items()}
+
+        params = ('Snipper.background_MAD', self.fs, self.pre, self.post, self.binlength)
+        return cached_background(self.data, params, compute)
+
+    def _snip_stats(self):
+        # reused until snips are replaced, e.g. by binning or removing artifacts
+        cached = getattr(self, '_snip_stats_cache', None)
+        if cached is None or cached[0] is not self.snips:
+            cached = (self.snips, _artifact_stats(self.snips))
+            self._snip_stats_cache = cached
+        return cached[1]
     
     def set_baseline(self):
         try:
@@ -194,46 +244,43 @@ class Snipper:
     
     def adjust_baseline(self):
         # doesn't currently use baseline start, only calculates baseline from beginning of snip to baseline end
+        self._snip_stats_cache = None  # snips may be changed in place
 
-        if len(self.snips.shape) == 1:
-            adj_snips = []
-            for snip in self.snips:
-                baseline = np.mean(snip[: self.baseline_end_in_samples])
-                adj_snips.append(np.subtract(snip, baseline))
-            self.snips = np.array(adj_snips, dtype=object)
+        if isinstance(self.snips, RaggedSnips) or self.snips.ndim == 1:
+            self.snips = self._as_ragged().adjust_baseline(self.baseline_end_in_samples)
         else:
             average_baseline = np.mean(self.snips[:, : self.baseline_end_in_samples], axis=1)
-            self.snips = np.subtract(self.snips.transpose(), average_baseline).transpose()
+            self.snips = self.snips - average_baseline[:, np.newaxis]
 
     def put_snip_in_bins(self, snip):
-        bins = ceil(len(snip)/(self.fs * self.binlength))
-        remainder_samples = len(snip) % bins
-        if remainder_samples == 0:
-            return np.reshape(snip, (bins, -1)).mean(axis=1)
-        else:
-            return np.reshape(snip[:-remainder_samples], (bins, -1)).mean(axis=1)
+        return bin_snips(np.asarray(snip)[np.newaxis, :], samples_per_bin=self.fs * self.binlength)[0]
     
+    def _as_ragged(self):
+        # snips of different lengths from longsnipper, or given as an object array
+        if isinstance(self.snips, RaggedSnips):
+            return self.snips
+        return RaggedSnips.from_list(self.snips)
+
     def bin_snips(self):
-        if len(self.snips.shape) == 1:
-            self.snips = np.array([self.put_snip_in_bins(snip) for snip in self.snips], dtype=object)
+        if isinstance(self.snips, RaggedSnips) or self.snips.ndim == 1:
+            self.snips = self._as_ragged().bin(self.fs * self.binlength)
         else:
-            self.snips = np.array([self.put_snip_in_bins(snip) for snip in self.snips])
+            self.snips = bin_snips(self.snips, samples_per_bin=self.fs * self.binlength)
 
     def zscore_snips(self):
+        self._snip_stats_cache = None  # snips may be changed in place
         if self.binned:
             baselinelength_for_zscore = int(self.baseline_end_in_samples / self.fs / self.binlength)
         else:
             baselinelength_for_zscore = self.baseline_end_in_samples
             
-        z_snips = []
-        for snip in self.snips:
-            mean = np.mean(snip[: baselinelength_for_zscore])
-            sd = np.std(snip[: baselinelength_for_zscore])
-            z_snips.append([(x - mean) / sd for x in snip])
-        try:
-            self.snips = np.array(z_snips)
-        except:
-            pass
+        if isinstance(self.snips, RaggedSnips):
+            self.snips.zscore(baselinelength_for_zscore)
+        elif isinstance(self.snips, np.ndarray) and self.snips.dtype == np.float64 and self.snips.ndim == 2 \
+                and self.snips.flags.writeable:
+            _zscore_rows(self.snips, baselinelength_for_zscore)
+        else:
+            self.snips = zscore(self.snips, baseline_points=baselinelength_for_zscore)
 
     def plot(self, ax=None, **kwargs):
 
@@ -282,7 +329,7 @@ class Snipper:
     
     def check_snips_array(self):
         print(type(self.snips))
-        if isinstance(self.snips, np.ndarray):
+        if isinstance(self.snips, (np.ndarray, RaggedSnips)):
             return True
         else:
             try:
@@ -296,6 +343,99 @@ class Snipper:
         # add little code to check whether self.snips is a 2D matrix
         pass
 
+    def save(self, path):
+        """
+        Saves snips, event times, noise index and settings to a directory.
+
+        Arrays are saved as .npy files (snips.npy, plus lengths.npy for snips of
+        different lengths) and settings as meta.json. The data stream is not saved.
+
+        Parameters
+        ----------
+        path : Str or Path
+            Directory to save to. Created if it does not exist.
+
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        ragged = isinstance(self.snips, RaggedSnips)
+        if ragged:
+            np.save(path / "snips.npy", self.snips.values)
+            np.save(path / "lengths.npy", self.snips.lengths)
+        else:
+            np.save(path / "snips.npy", np.asarray(self.snips))
+
+        arrays = {"start": self.start, "end": self.end,
+                  "events_in_samples": getattr(self, "events_in_samples", None),
+                  "noiseindex": getattr(self, "noiseindex", None)}
+        for name, array in arrays.items():
+            if array is not None:
+                np.save(path / f"{name}.npy", np.asarray(array))
+
+        meta = {"version": _SAVE_VERSION, "ragged": ragged, "fs": self.fs, "pre": self.pre, "post": self.post,
+                "baselinelength": self.baselinelength, "adjustbaseline": self.adjustbaseline,
+                "binlength": self.binlength, "binned": getattr(self, "binned", False),
+                "zscore": self.zscore, "truncate": self.truncate, "nsnips": len(self.snips),
+                "arrays": [name for name, array in arrays.items() if array is not None]}
+        with open(path / "meta.json", "w") as f:
+            json.dump(meta, f, indent=2, default=_to_json)
+
+    @classmethod
+    def load(cls, path, data=None, mmap_mode="r"):
+        """
+        Loads a Snipper saved with save.
+
+        Snips are memory-mapped, so loading is fast whatever their size and values are
+        only read from disk when used.
+
+        Parameters
+        ----------
+        path : Str or Path
+            Directory that Snipper was saved to.
+        data : 1D array, optional
+            Data stream the snips were made from, needed to re-snip or find artifacts.
+            The default is None.
+        mmap_mode : Str, optional
+            Passed to np.load. With the default 'r', snips are copied into memory
+            when first changed (e.g. by zscore_snips), 'c' changes them in memory
+            without changing files and None reads snips into memory.
+
+        Returns
+        -------
+        snipper : Snipper
+            Snipper with snips and settings as when saved.
+
+        """
+        path = Path(path)
+        with open(path / "meta.json") as f:
+            meta = json.load(f)
+        if meta.get("version", 0) > _SAVE_VERSION:
+            raise ValueError(f"{path} was saved by a newer version of trompy.")
+
+        snipper = cls.__new__(cls)
+        snipper.data = None if data is None else load_stream(data)
+        for key in ["fs", "pre", "post", "baselinelength", "adjustbaseline", "binlength", "binned",
+                    "zscore", "truncate", "nsnips"]:
+            setattr(snipper, key, meta[key])
+        snipper.kwargs = {key: meta[key] for key in ["fs", "pre", "post", "baselinelength", "adjustbaseline",
+                                                      "binlength", "zscore", "truncate"]}
+        snipper.remove_artifacts = False
+        snipper.end = None
+
+        snips = np.load(path / "snips.npy", mmap_mode=mmap_mode)
+        if meta["ragged"]:
+            snips = RaggedSnips(snips, np.load(path / "lengths.npy"))
+        snipper.snips = snips
+
+        for name in meta["arrays"]:
+            setattr(snipper, name, np.load(path / f"{name}.npy"))
+        if snipper.end is not None:
+            snipper.end = list(snipper.end)
+        snipper.set_baseline()
+
+        return snipper
+
 if __name__ == '__main__':
     # data = np.random.rand(100000)
     # start = [20, 75]
@@ -326,4 +466,8 @@ if __name__ == '__main__':
     start = lickdata["rStart"]
 
     snipper = Snipper(data, start, fs=fs, binlength=0.1, remove_artifacts=True, adjustbaseline=True, baselinelength=[10, 5])
-    s = snipper.get_snips()
\ No newline at end of file
+    s = snipper.get_snips()
+
+    # saved snips can be reopened without loading the pickle or re-snipping
+    # snipper.save(DATAPATH.parent / "HL208_6_snips")
+    # snipper = Snipper.load(DATAPATH.parent / "HL208_6_snips")
\ No newline at end of file
@@ -5,11 +5,17 @@ Created on Fri Apr 17 11:51:29 2020
 @author: James Edgar McCutcheon
 """
 
+from pathlib import Path
+import weakref
 import numpy as np
 import scipy.signal as sig
-from math import ceil
+import scipy.fft as spfft
+from numpy.lib.stride_tricks import sliding_window_view
+from trompy.snip_view import SnipView
+from trompy.filter_utils import filter_data, _design_ba
 
-def processdata(data, datauv, method='konanur', normalize=True, normalize_time_cutoff=5, normalize_method="zscore", fs=1017):
+def processdata(data, datauv, method='konanur', normalize=True, normalize_time_cutoff=5, normalize_method="zscore", fs=1017,
+                dtype=np.float64, fit_decimate=1, fit_window=None, lowpass=None):
     """ Corrects for baseline when given calcium-moldulated and non-Ca modulated streams.
 
     Parameters
@@ -38,6 +44,22 @@ def processdata(data, datauv, method='konanur', normalize=True, normalize_time_c
         Default is zscore. Other options are 'df' for deltaF/F and "old" which scales based on an arbitrary 3*SD.
     fs : Int, optional
         Used when normalizing signal. 1017 is default.
+    dtype : numpy dtype, optional
+        Precision used for the FFT, filtering and returned signal. For 'konanur',
+        np.float32 halves peak memory use for long recordings. For 'lerner', the
+        isosbestic fit is still calculated in float64, so only the output is halved.
+        The default is np.float64.
+    fit_decimate : Int, optional
+        For 'lerner', fits the isosbestic using every nth sample only, which is much
+        faster for long recordings and changes the fit very little. The default is 1.
+    fit_window : Float, optional
+        For 'lerner', fits the isosbestic separately in windows of this many seconds
+        to follow changes such as bleaching. The default is None (one fit).
+    lowpass : Float, optional
+        For 'konanur', cutoff (in Hz) of a zero-phase 9th-order Butterworth low-pass
+        applied to the corrected signal. The default is None, which keeps the original
+        konanur filter. That passes an analog Butterworth design to filtfilt, so it acts
+        as a flat gain of about 1e-17 (removed by normalize) rather than a low-pass.
 
     Returns
     -------
@@ -47,23 +69,32 @@ def processdata(data, datauv, method='konanur', normalize=True, normalize_time_c
     """
     if method == 'konanur':
         pt = len(data)
-        X = np.fft.rfft(datauv, pt)
-        Y = np.fft.rfft(data, pt)
-        Ynet = Y-X
+        # zero-padding to a length with small prime factors keeps the FFT fast for any
+        # recording length and the padding is removed after the inverse transform
+        nfft = spfft.next_fast_len(pt, real=True)
+        Ynet = spfft.rfft(np.asarray(data, dtype=dtype), nfft)
+        Ynet -= spfft.rfft(np.asarray(datauv, dtype=dtype), nfft)
     
-        df = np.fft.irfft(Ynet) 
-        df = sig.detrend(df)
+        df = spfft.irfft(Ynet, nfft)[:pt]
+        del Ynet
+        df = sig.detrend(df, overwrite_data=True)
     
-        b, a = sig.butter(9, 0.012, 'low', analog=True)
-        df = sig.filtfilt(b, a, df)
+        if lowpass is None:
+            # original design, kept so results are unchanged (see lowpass)
+            b, a = _design_ba(9, 0.012, 'low', True)
+            df = sig.filtfilt(b.astype(dtype), a.astype(dtype), df).astype(dtype, copy=False)
+        else:
+            df = filter_data(df, lowpass, fs=fs, order=9).astype(dtype, copy=False)
         
     elif method == 'lerner' or method == 'lerner-davidson' or method == 'davidson':
-        x = np.array(datauv)
-        y = np.array(data)
-        bls = np.polyfit(x, y, 1)
-        Y_fit_all = np.multiply(bls[0], x) + bls[1]
-        Y_dF_all = y - Y_fit_all
-        df = np.multiply(100, np.divide(Y_dF_all, Y_fit_all))
+        window = None if fit_window is None else int(fit_window*fs)
+        fit = isosbestic_fit(datauv, data, decimate=fit_decimate, window=window).astype(dtype, copy=False)
+        # y becomes the corrected signal without new arrays
+        y = np.array(data, dtype=dtype)
+        y -= fit
+        y /= fit
+        y *= 100
+        df = y
         
     else:
         print(method, 'is not a valid method. Exiting without any snipper output')
@@ -80,40 +111,216 @@ def processdata(data, datauv, method='konanur', normalize=True, normalize_time_c
         else:
             nsamples = normalize_time_cutoff*60*fs
             
-        cutoff_range = range(nsamples, len(df)-nsamples)
-        mean=np.mean(df[cutoff_range])
-        sd=np.std(df[cutoff_range])
+        cutoff_range = slice(nsamples, len(df)-nsamples)
+        mean=np.mean(df[cutoff_range], dtype=np.float64)
+        sd=np.std(df[cutoff_range], dtype=np.float64)
         
         epsilon = 1e-10
         
         if normalize_method == "zscore":
-            df_corr = np.subtract(df, mean)
+            df -= mean
             if sd == 0:
-                df=np.divide(df_corr, epsilon)
+                df /= epsilon
             else:
-                df=np.divide(df_corr, sd)
+                df /= sd
         elif normalize_method == "df":
             if np.abs(mean) == 0:
-                df=np.divide(df, epsilon)*100
+                df /= epsilon
             else:
-                df=np.divide(df, np.abs(mean))*100
+                df /= np.abs(mean)
+            df *= 100
         elif normalize_method == "old":
             if sd == 0:
-                df=np.divide(df, epsilon)
+                df /= epsilon
             else:
-                df=np.divide(df, sd*3)
+                df /= sd*3
     
     return df
 
+def processdata_batch(data, datauv, n_jobs=1, out=None, **kwargs):
+    """
+    Runs processdata on several channels or recordings, optionally in parallel.
+
+    Parameters
+    ----------
+    data : 2D array (channels x samples) or List of 1D arrays
+        Primary data streams (Ca-modulated). Recordings in a list can differ in length.
+    datauv : 2D array, 1D array or List of 1D arrays
+        Secondary data streams (non-Ca modulated), matching data. A single 1D array
+        is used for every channel of a 2D data array.
+    n_jobs : Int, optional
+        Number of processes. When greater than 1, streams are copied once into shared
+        memory and each process reads its inputs and writes its output there, so
+        arrays are not pickled. The default is 1.
+    out : 2D array, optional
+        Array to write output to, same shape as a 2D data array. The default is None.
+    **kwargs
+        Passed to processdata, e.g. method, normalize, fs.
+
+    Returns
+    -------
+    out : 2D array or List of 1D arrays
+        Processed streams. For a list of recordings, a list of views into one array.
+
+    """
+    if kwargs.get('method', 'konanur') not in ('konanur', 'lerner', 'lerner-davidson', 'davidson'):
+        raise ValueError(f"{kwargs['method']} is not a valid method.")
+    dtype = np.dtype(kwargs.get('dtype', np.float64))
+
+    is_2d = isinstance(data, np.ndarray) and data.ndim == 2
+    if is_2d and np.ndim(datauv) == 1:
+        datauv = [datauv] * len(data)
+    if len(data) != len(datauv):
+        raise ValueError("data and datauv must have the same number of channels.")
+
+    lengths = np.array([len(stream) for stream in data], dtype=np.int64)
+    if np.any(lengths != np.array([len(stream) for stream in datauv])):
+        raise ValueError("Each data stream must be the same length as its datauv stream.")
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+
+    if out is None:
+        output = np.empty(offsets[-1], dtype=dtype)
+    elif not is_2d or out.shape != data.shape:
+        raise ValueError("out must be a 2D array of the same shape as data.")
+    else:
+        output = out.reshape(-1)
+
+    if n_jobs is None or n_jobs <= 1 or len(lengths) < 2:
+        for start, stop, stream, streamuv in zip(offsets[:-1], offsets[1:], data, datauv):
+            output[start:stop] = processdata(stream, streamuv, **kwargs)
+    else:
+        _processdata_shared(data, datauv, offsets, output, n_jobs, kwargs)
+
+    if is_2d:
+        return output.reshape(data.shape) if out is None else out
+    return [output[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+
+def _processdata_shared(data, datauv, offsets, output, n_jobs, kwargs):
+    """Runs processdata in a process pool with inputs and output in shared memory."""
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+
+    total = int(offsets[-1])
+    blocks = [shared_memory.SharedMemory(create=True, size=max(total * np.dtype(np.float64).itemsize, 1))
+              for _ in range(3)]
+    try:
+        inputs = [np.ndarray(total, dtype=np.float64, buffer=block.buf) for block in blocks[:2]]
+        for start, stop, stream, streamuv in zip(offsets[:-1], offsets[1:], data, datauv):
+            inputs[0][start:stop] = stream
+            inputs[1][start:stop] = streamuv
+
+        names = [block.name for block in blocks]
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            jobs = [pool.submit(_processdata_segment, names, total, int(start), int(stop), kwargs)
+                    for start, stop in zip(offsets[:-1], offsets[1:])]
+            for job in jobs:
+                job.result()
+
+        output[:] = np.ndarray(total, dtype=np.float64, buffer=blocks[2].buf)
+        del inputs
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+def _processdata_segment(names, total, start, stop, kwargs):
+    """Worker for _processdata_shared. Processes one stream and writes it to shared output."""
+    from multiprocessing import shared_memory
+
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    try:
+        data, datauv, output = [np.ndarray(total, dtype=np.float64, buffer=block.buf) for block in blocks]
+        output[start:stop] = processdata(data[start:stop], datauv[start:stop], **kwargs)
+        del data, datauv, output
+    finally:
+        for block in blocks:
+            block.close()
+
+def isosbestic_fit(datauv, data, decimate=1, window=None):
+    """
+    Least-squares fit of the isosbestic to the primary data stream.
+
+    The fit is calculated in closed form from sums, so it can be done on a decimated
+    signal and in windows at little cost. With windows, slope and intercept are
+    interpolated between window centres so the fit has no steps.
+
+    Parameters
+    ----------
+    datauv : List or 1D array of Floats
+        Secondary data stream (non-Ca modulated).
+    data : List or 1D array of Floats
+        Primary data stream (Ca-modulated).
+    decimate : Int, optional
+        Uses every nth sample to fit. The default is 1.
+    window : Int, optional
+        Length (in samples) of windows to fit separately. The default is None (one fit).
+
+    Returns
+    -------
+    fit : 1D array of Floats
+        Fitted isosbestic (slope * datauv + intercept) for every sample.
+
+    """
+    x = np.asarray(datauv, dtype=np.float64)
+    y = np.asarray(data, dtype=np.float64)
+    decimate = max(int(decimate), 1)
+
+    # centring before summing avoids losing precision when signals have large offsets
+    x_fit = x[::decimate]
+    x0, y0 = np.mean(x_fit), np.mean(y[::decimate])
+    x_fit = x_fit - x0
+    y_fit = y[::decimate] - y0
+
+    if window is None or window >= len(x):
+        starts = np.zeros(1, dtype=np.int64)
+        n = np.array([len(x_fit)])
+        sums = [np.sum(x_fit), np.sum(y_fit), np.dot(x_fit, x_fit), np.dot(x_fit, y_fit)]
+    else:
+        starts = np.arange(0, len(x_fit), max(int(np.ceil(window / decimate)), 2))
+        n = np.diff(np.append(starts, len(x_fit)))
+        sums = [np.add.reduceat(values, starts) for values in (x_fit, y_fit, x_fit*x_fit, x_fit*y_fit)]
+    slope, intercept = _fit_from_sums(n, *sums)
+
+    if len(starts) > 1:
+        centres = (starts + (n - 1) / 2) * decimate
+        samples = np.arange(len(x))
+        slope = np.interp(samples, centres, slope)
+        intercept = np.interp(samples, centres, intercept)
+    else:
+        slope, intercept = slope[0], intercept[0]
+
+    fit = x - x0
+    fit *= slope
+    fit += intercept + y0
+    return fit
+
+def _fit_from_sums(n, sum_x, sum_y, sum_xx, sum_xy):
+    """
+    Closed-form least-squares fit of y = slope*x + intercept from running sums.
+
+    Sums can be accumulated over chunks or windows, so a fit never needs all samples in
+    memory at once. Arrays of sums give one fit per element. If x does not vary the
+    slope is 0 and the intercept is the mean of y.
+    """
+    n, sum_x, sum_y, sum_xx, sum_xy = (np.asarray(v, dtype=np.float64) for v in (n, sum_x, sum_y, sum_xx, sum_xy))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denominator = n*sum_xx - sum_x**2
+        # variance of x lost in rounding is treated as zero
+        varies = denominator > 1e-12 * n*sum_xx
+        slope = np.where(varies, (n*sum_xy - sum_x*sum_y) / denominator, 0.0)
+        intercept = (sum_y - slope*sum_x) / n
+    return slope, intercept
+
 def snipper(data, timestamps, fs=1, baseline_length=10, trial_length=30,
                  adjust_baseline = True,
-                 bins = 0, **kwargs):
+                 bins = 0, view=False, dtype=None, **kwargs):
     """ Makes 'snips' of a data file aligned to an event of interest.
 
     Parameters
     ----------
-    data : List or array of floats
-        Data to be divided into snips.
+    data : List, array of floats, np.memmap or Str/Path
+        Data to be divided into snips. Can be a path to a .npy file or a raw binary
+        file, which is memory-mapped so only the samples in each snip are read.
     timestamps : List
         Timestamps of events to be used to align data.
     fs : Float, optional
@@ -129,10 +336,16 @@ def snipper(data, timestamps, fs=1, baseline_length=10, trial_length=30,
     bins : Int, optional
         Number of bins to divide trial length into. The default is 0. If set at default
         of 0 then no binning will occur.
+    view : Bool, optional
+        When True snips are returned as a read-only SnipView of data rather than
+        copied into a new array, which saves memory when there are many events.
+        Only possible when adjust_baseline is False and bins is 0. The default is False.
+    dtype : Str or numpy dtype, optional
+        Data type of samples when data is a path to a raw binary file. The default is None.
 
     Returns
     -------
-    snips : List of lists
+    snips : List of lists, 2D array or SnipView
         List of X snips of Y length where X=number of events in timelock and Y=bins
     pps : Int
         Samples (points) per second 
@@ -158,11 +371,34 @@ def snipper(data, timestamps, fs=1, baseline_length=10, trial_length=30,
     if len(timestamps) == 0:
         print('No events to analyse! Quitting function.')
         raise Exception('no events')
-    
+
+    if view and (adjust_baseline or bins > 0):
+        raise ValueError("view=True can only be used with adjust_baseline=False and bins=0.")
+
+    data = load_stream(data, dtype=dtype)
+    trial_start, trial_length_in_samples, baseline_end_in_samples = \
+        _snip_plan(len(data), timestamps, fs, baseline_length, trial_length)
+
+    if view:
+        return SnipView(data, trial_start, trial_length_in_samples), int(fs)
+
+    snips = get_windows(data, trial_start, trial_length_in_samples)
+    snips = _finish_snips(snips, baseline_end_in_samples, adjust_baseline, bins)
+              
+    return snips, int(fs)
+
+def _snip_plan(n_samples, timestamps, fs, baseline_length, trial_length):
+    """
+    Works out which events can be snipped from a stream of n_samples and where.
+
+    Returns start sample of each snip, snip length and end of baseline (in samples).
+    The same plan can be applied to every stream recorded with the same clock.
+    """
     # removes non-numeric values, e.g. nans or infinite
-    timestamps = [i for i in timestamps if np.isfinite(i)]
+    timestamps = np.asarray(timestamps, dtype=float)
+    timestamps = timestamps[np.isfinite(timestamps)]
     
-    events_in_samples = [ceil(timestamp*fs) for timestamp in timestamps]
+    events_in_samples = np.ceil(timestamps*fs).astype(np.int64)
     
     try:
         if len(baseline_length) == 2:
@@ -179,32 +415,153 @@ def snipper(data, timestamps, fs=1, baseline_length=10, trial_length=30,
     trial_length_in_samples = int(trial_length*fs)
 
     # removes events where an entire snip cannot be made
-    events_in_samples = [event for event in events_in_samples if \
-        (event-baseline_start_in_samples > 0) and \
-        (event-baseline_start_in_samples+trial_length_in_samples) < len(data)]
+    trial_start = events_in_samples - baseline_start_in_samples
+    trial_start = trial_start[(trial_start > 0) & (trial_start + trial_length_in_samples < n_samples)]
 
-    n_snips = len(events_in_samples)
-    snips = np.empty([n_snips, trial_length_in_samples])
-    
-    trial_start = [event - baseline_start_in_samples for event in events_in_samples]
-    trial_end = [start + trial_length_in_samples for start in trial_start]
-
-    for idx, (start, end) in enumerate(zip(trial_start, trial_end)):
-        snips[idx] = data[start : end]
+    return trial_start, trial_length_in_samples, baseline_end_in_samples
 
+def _finish_snips(snips, baseline_end_in_samples, adjust_baseline, bins):
+    """Subtracts baseline from and bins snips made by get_windows."""
     if adjust_baseline == True:
         average_baseline = np.mean(snips[:,:baseline_end_in_samples], axis=1)
-        snips = np.subtract(snips.transpose(), average_baseline).transpose()
-        # snips = np.divide(snips.transpose(), np.abs(average_baseline)).transpose()
+        snips = snips - average_baseline[:, np.newaxis]
 
     if bins > 0:
-        if trial_length_in_samples % bins != 0:
-            snips = snips[:,:-(trial_length_in_samples % bins)]
-        totaltime = snips.shape[1] / int(fs)
-        snips = np.mean(snips.reshape(n_snips,bins,-1), axis=2)
-        pps = bins/totaltime
-              
-    return snips, int(fs)
+        snips = bin_snips(snips, bins=bins)
+
+    return snips
+
+_BIN_REDUCTIONS = {'mean': np.add, 'sum': np.add, 'max': np.maximum}
+
+def _bin_edges(lengths, samples_per_bin):
+    """Number of bins per snip and start and stop sample of every bin (flattened) for snips of given lengths."""
+    if samples_per_bin < 1:
+        raise ValueError("Bins must contain at least one sample.")
+    lengths = np.asarray(lengths, dtype=np.int64)
+    # rounding stops floating point error adding a bin or moving an edge
+    n_bins = np.ceil(np.round(lengths / samples_per_bin, 9)).astype(np.int64)
+    bin_idx = np.arange(n_bins.sum()) - np.repeat(np.cumsum(n_bins) - n_bins, n_bins)
+    starts = np.floor(np.round(bin_idx * samples_per_bin, 9)).astype(np.int64)
+    stops = np.minimum(np.floor(np.round((bin_idx + 1) * samples_per_bin, 9)).astype(np.int64),
+                       np.repeat(lengths, n_bins))
+    return n_bins, starts, stops
+
+def _reduce_bins(flat, bin_starts, bin_stops, method):
+    """Reduces flat[start:stop] for every bin, where bins tile flat without gaps."""
+    if method not in _BIN_REDUCTIONS:
+        raise ValueError(f"method must be one of {list(_BIN_REDUCTIONS)}.")
+    if len(bin_starts) == 0:
+        return np.empty(0)
+    binned = _BIN_REDUCTIONS[method].reduceat(flat, bin_starts)
+    if method == 'mean':
+        binned = binned / (bin_stops - bin_starts)
+    return binned
+
+def bin_snips(snips, bins=None, samples_per_bin=None, method='mean'):
+    """
+    Bins every snip in a single operation.
+
+    Bin edges are placed at whole multiples of samples_per_bin and rounded down to
+    the nearest sample, so bins stay aligned to time when samples_per_bin is not a
+    whole number (e.g. 1017 Hz x 0.1 s bins) and no samples are dropped. Bins can
+    therefore differ in size by one sample. When samples_per_bin is given the last
+    bin may be partial.
+
+    Parameters
+    ----------
+    snips : 2D array of Floats
+        Snips to be binned, one per row.
+    bins : Int, optional
+        Number of bins to divide each snip into. The default is None.
+    samples_per_bin : Float, optional
+        Number of samples in each bin, e.g. fs * binlength. Used instead of bins to
+        give ceil(snip length / samples_per_bin) bins. The default is None.
+    method : Str, optional
+        How samples in each bin are combined, 'mean', 'sum' or 'max'. The default is 'mean'.
+
+    Returns
+    -------
+    binned : 2D array of Floats
+        Binned snips.
+
+    """
+    snips = np.asarray(snips)
+    n_snips, length = snips.shape
+    if (bins is None) == (samples_per_bin is None):
+        raise ValueError("Give one of bins or samples_per_bin.")
+    if samples_per_bin is None:
+        samples_per_bin = length / bins
+
+    n_bins, starts, stops = _bin_edges([length], samples_per_bin)
+    # bins of all snips as one reduceat over the flattened array
+    offsets = (np.arange(n_snips) * length)[:, np.newaxis]
+    binned = _reduce_bins(snips.reshape(-1), (offsets + starts).ravel(),
+                          (offsets + stops).ravel(), method)
+    return binned.reshape(n_snips, n_bins[0])
+
+def get_windows(data, starts, length):
+    """
+    Copies windows of equal length out of a data stream in a single gather.
+
+    Parameters
+    ----------
+    data : List or 1D array
+        Data stream.
+    starts : List or 1D array of Ints
+        Sample index at which each window starts. Every window must fit inside data.
+    length : Int
+        Number of samples in each window.
+
+    Returns
+    -------
+    windows : 2D array of Floats
+        Array of shape (len(starts), length).
+
+    """
+    data = np.asarray(data)
+    starts = np.asarray(starts, dtype=np.int64)
+    if len(starts) == 0 or length > len(data):
+        return np.empty([len(starts), length])
+
+    # rows of the strided view are windows, so indexing copies only the rows needed
+    windows = sliding_window_view(data, length)[starts]
+    return windows.astype(np.float64, copy=False)
+
+def load_stream(data, dtype=None, offset=0):
+    """
+    Returns a data stream as an array, memory-mapping it if a path is given.
+
+    Memory-mapped streams are read from disk only where they are indexed, so cutting
+    snips from a long recording reads only the windows around events.
+
+    Parameters
+    ----------
+    data : List, array, np.memmap or Str/Path
+        Data stream, or path to a .npy file or raw binary file containing one.
+    dtype : Str or numpy dtype, optional
+        Data type of samples in a raw binary file, e.g. 'float32'. Required for raw
+        files and ignored otherwise. The default is None.
+    offset : Int, optional
+        Number of bytes to skip at the start of a raw binary file (e.g. a header).
+        The default is 0.
+
+    Returns
+    -------
+    data : 1D array or np.memmap
+        Data stream. Arrays and memmaps are returned without copying.
+
+    """
+    if isinstance(data, (str, Path)):
+        path = Path(data)
+        if path.suffix == '.npy':
+            return np.load(path, mmap_mode='r')
+        if dtype is None:
+            raise ValueError(f"dtype must be given to read raw data from {path}.")
+        return np.memmap(path, dtype=dtype, mode='r', offset=offset)
+
+    if isinstance(data, np.ndarray):
+        return data
+    return np.asarray(data)
 
 def mastersnipper(data, dataUV, data_filt, fs, events,
                   trialLength=30,
@@ -314,34 +671,37 @@ def mastersnipper(data, dataUV, data_filt, fs, events,
     else:
         if verbose: print('{} events to analyze.'.format(len(events)))
 
+    # the (n_events, trial length) array of sample indices is worked out once and used
+    # to gather snips from every stream of the same length. Streams are not stacked into
+    # one array for a single gather as that would copy (or, if memory-mapped, read) them
+    # in full.
+    plans = {}
+    def snip_stream(stream, adjust_baseline):
+        stream = np.asarray(stream)
+        if len(stream) not in plans:
+            trial_start, trial_length_in_samples, baseline_end_in_samples = _snip_plan(
+                len(stream), events, fs, baseline, trialLength)
+            sample_idx = trial_start[:, np.newaxis] + np.arange(trial_length_in_samples)
+            plans[len(stream)] = sample_idx, baseline_end_in_samples
+        sample_idx, baseline_end_in_samples = plans[len(stream)]
+        snips = stream[sample_idx].astype(np.float64, copy=False)
+        return _finish_snips(snips, baseline_end_in_samples, adjust_baseline, bins)
+
     if len(data) > 0:
-        blueTrials,_ = snipper(data, events,
-                                       fs=fs,
-                                       bins=bins,
-                                       preTrial=baseline,
-                                       trialLength=trialLength)
+        blueTrials = snip_stream(data, True)
     else:
         print('No data stream available as primary data input. Exiting without snipping.')
         return {}
     
     if len(dataUV) > 0:
-        uvTrials,_ = snipper(dataUV, events,
-                                   fs=fs,
-                                   bins=bins,
-                                   preTrial=baseline,
-                                   trialLength=trialLength)
+        uvTrials = snip_stream(dataUV, True)
     else:
         print('No UV (secondary) data stream.')
         uvTrials = []
     if len(data_filt) > 0:
-        filtTrials,_ = snipper(data_filt, events,
-                                   fs=fs,
-                                   bins=bins,
-                                   preTrial=baseline,
-                                   trialLength=trialLength,
-                                   adjustBaseline=False)
-
-        filtTrials_z = np.asarray(zscore(filtTrials, baseline_points=baselinebins))
+        filtTrials = snip_stream(data_filt, False)
+
+        filtTrials_z = zscore(filtTrials, baseline_points=baselinebins)
     else:
         print('No processed data stream.')
         filtTrials, filtTrials_z  = [], []
@@ -354,7 +714,7 @@ def mastersnipper(data, dataUV, data_filt, fs, events,
     else:
         bgMAD = kwargs['bgMAD']
 
-    sigSum = [np.sum(abs(i)) for i in blueTrials]
+    sigSum = np.sum(np.abs(blueTrials), axis=1)
     noiseindex = [i > bgMAD*threshold for i in sigSum]
 
     if sum(noiseindex) == len(noiseindex):
@@ -367,7 +727,7 @@ def mastersnipper(data, dataUV, data_filt, fs, events,
         else:
             filt_avg = np.mean(filtTrials, axis=0)
             
-        filt_avg_z = [(x-np.mean(filt_avg))/np.std(filt_avg) for x in filt_avg]
+        filt_avg_z = _zscore_rows(np.array(filt_avg, dtype=np.float64, ndmin=2), len(filt_avg))[0]
     else:
         filt_avg, filt_avg_z  = [], []
     
@@ -380,22 +740,8 @@ def mastersnipper(data, dataUV, data_filt, fs, events,
     # Code to find latencies associated with each trial
     latency = []
     if len(latency_events) > 1: 
-        for event in events:
-            if latency_direction == 'pre':
-                try:
-                    latency.append(np.abs([lat-event for lat in latency_events if lat-event<0]).min())
-                except ValueError:
-                    latency.append(np.NaN)
-            
-            elif latency_direction == 'post':
-                try:
-                    latency.append(np.abs([lat-event for lat in latency_events if lat-event>0]).min())
-                except ValueError:
-                    latency.append(np.NaN)
-
-        latency = [x if (x<max_latency) else np.NaN for x in latency]
-        if latency_direction == 'pre':
-            latency = [-x for x in latency]
+        latency = event_latencies(events, latency_events, direction=latency_direction,
+                                  max_latency=max_latency)
     else:
         print('No latency events found')
         
@@ -423,33 +769,130 @@ def mastersnipper(data, dataUV, data_filt, fs, events,
     
     return output
 
+def event_latencies(events, targets, direction='pre', max_latency=None):
+    """
+    Finds latency from each event to the nearest target event before or after it.
+
+    Parameters
+    ----------
+    events : List or 1D array of floats
+        Timestamps of events, e.g. cues.
+    targets : List or 1D array of floats
+        Timestamps of target events, e.g. licks. Do not need to be sorted.
+    direction : Str, optional
+        'pre' to find the last target before each event or 'post' to find the first
+        target after each event. The default is 'pre'.
+    max_latency : Float, optional
+        Latencies of this or longer are set to NaN. The default is None (no limit).
+
+    Returns
+    -------
+    latency : 1D array of floats
+        Latency for each event (negative for 'pre'). NaN if no target is found.
+
+    """
+    events = np.asarray(events, dtype=float)
+    targets = np.sort(np.asarray(targets, dtype=float))
+    targets = targets[~np.isnan(targets)]
+
+    if direction == 'pre':
+        # index of last target strictly before each event
+        idx = np.searchsorted(targets, events, side='left') - 1
+        found = idx >= 0
+    elif direction == 'post':
+        # index of first target strictly after each event
+        idx = np.searchsorted(targets, events, side='right')
+        found = idx < len(targets)
+    else:
+        raise ValueError(f"{direction} is not a valid direction. Use 'pre' or 'post'.")
+
+    latency = np.full(len(events), np.nan)
+    latency[found] = np.abs(targets[idx[found]] - events[found])
+
+    if max_latency is not None:
+        latency[~(latency < max_latency)] = np.nan
+    if direction == 'pre':
+        latency = -latency
+
+    return latency
+
 def zscore(snips, baseline_points=100):
     """
     Converts list or array of snips into Z-scored values.
 
     Parameters
     ----------
-    snips : List of lists or 2D Array
-        Data to be converted into z-scores.
+    snips : List of lists, 2D Array or object array of 1D arrays
+        Data to be converted into z-scores. Snips can be different lengths (e.g. from
+        Snipper.longsnipper).
     baseline_points : Int, optional
         Number of bins or points to be used as the baseline for z-score calculation. The default is 100.
 
     Returns
     -------
-    z_snips : List of lists
-        Converted snips expressed as z-scores.
+    z_snips : 2D array or object array of 1D arrays
+        Converted snips expressed as z-scores. Snips with a baseline SD of zero are NaN.
+        If snips were different lengths, an object array of 1D arrays is returned.
     """
-    
-    BL_range = range(baseline_points)
-    z_snips = []
-    for i in snips:
-        mean = np.mean(i[BL_range])
-        sd = np.std(i[BL_range])
-        z_snips.append([(x-mean)/sd for x in i])
-        
-    return z_snips
+    padded, lengths = _pad_snips(snips)
+    _zscore_rows(padded, baseline_points, ignore_nan=lengths is not None)
+
+    if lengths is None:
+        return padded
+    return _unpad_snips(padded, lengths)
+
+def _pad_snips(snips):
+    """
+    Copies snips into a new 2D float array. Snips that are different lengths are
+    padded with NaN at the end and their lengths are also returned (otherwise None).
+    """
+    if isinstance(snips, np.ndarray) and snips.dtype != object:
+        return np.array(snips, dtype=np.float64, ndmin=2), None
+
+    lengths = np.array([len(snip) for snip in snips], dtype=np.int64)
+    if len(lengths) == 0:
+        return np.empty([0, 0]), None
+    if np.all(lengths == lengths[0]):
+        return np.array([np.asarray(snip, dtype=np.float64) for snip in snips]).reshape(len(lengths), -1), None
+
+    padded = np.full([len(lengths), lengths.max()], np.nan)
+    # positions of every value in the padded array, filled in one assignment
+    mask = np.arange(lengths.max()) < lengths[:, np.newaxis]
+    padded[mask] = np.concatenate([np.asarray(snip, dtype=np.float64) for snip in snips])
+    return padded, lengths
+
+def _unpad_snips(padded, lengths):
+    """Converts a NaN-padded 2D array back to an object array of 1D arrays of the given lengths."""
+    snips = np.empty(len(lengths), dtype=object)
+    for idx, length in enumerate(lengths):
+        snips[idx] = padded[idx, :length]
+    return snips
+
+def _zscore_rows(snips, baseline_points, ignore_nan=False):
+    """
+    Z-scores each row of a 2D float array in place using the mean and SD of its first
+    baseline_points values. Rows with a baseline SD of zero become NaN rather than inf.
+    When ignore_nan is True, NaN (e.g. padding) is left out of the baseline.
+    """
+    if snips.size == 0:
+        return snips
+
+    baseline = snips[:, :baseline_points]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if ignore_nan:
+            n = np.sum(~np.isnan(baseline), axis=1)
+            mean = np.nansum(baseline, axis=1) / n
+            sd = np.sqrt(np.nansum((baseline - mean[:, np.newaxis])**2, axis=1) / n)
+        else:
+            mean = np.mean(baseline, axis=1)
+            sd = np.std(baseline, axis=1)
+        sd[sd == 0] = np.nan
 
-def findnoise(data, background_events, fs = 1, bins=0, method='sd'):
+        snips -= mean[:, np.newaxis]
+        snips /= sd[:, np.newaxis]
+    return snips
+
+def findnoise(data, background_events, fs = 1, bins=0, method='sd', cache=True):
     """
     Identifies snips that are classed as noisy due to exceeding a threshold based on background.
 
@@ -467,6 +910,10 @@ def findnoise(data, background_events, fs = 1, bins=0, method='sd'):
         Number of bins to be used for snips. The default is 0.
     method : Str, optional
         Method of calculating noise. 'sd' or 'sum' (standard deviation or sum). Default is 'sd'.
+    cache : Bool, optional
+        Reuses bgMAD from an earlier call with the same data array and arguments,
+        e.g. when mastersnipper is run for several event types in one recording. If
+        data is changed in place, call clear_background_cache first. The default is True.
 
     Returns
     -------
@@ -474,17 +921,64 @@ def findnoise(data, background_events, fs = 1, bins=0, method='sd'):
         Median absoluate deviation of background trials.
 
     """
-    
-    bgSnips, _ = snipper(data, background_events, fs=fs, bins=bins)
-    
-    if method == 'sum':
-        bgSum = [np.sum(abs(i)) for i in bgSnips]
-        bgMAD = med_abs_dev(bgSum)
-    elif method == 'sd':
-        bgSD = [np.std(i) for i in bgSnips]
-        bgMAD = med_abs_dev(bgSD)
-   
-    return bgMAD
+    def compute():
+        bgSnips, _ = snipper(data, background_events, fs=fs, bins=bins)
+
+        if method == 'sum':
+            return med_abs_dev(np.sum(np.abs(bgSnips), axis=1))
+        elif method == 'sd':
+            return med_abs_dev(np.std(bgSnips, axis=1))
+
+    if not cache:
+        return compute()
+
+    params = ('findnoise', tuple(np.asarray(background_events, dtype=float)), fs, bins, method)
+    return cached_background(data, params, compute)
+
+# Background statistics per recording, keyed by id of the data array. Each entry holds a
+# weak reference to the array, so it is dropped when the array is garbage collected and
+# a new array that reuses the same id is not mistaken for it.
+_background_cache = {}
+
+def cached_background(data, params, compute):
+    """
+    Returns compute(), reusing the value from an earlier call with the same data
+    object and params.
+
+    Parameters
+    ----------
+    data : 1D array
+        Data stream the value is calculated from. Objects that cannot be weakly
+        referenced (e.g. lists) are never cached.
+    params : Tuple
+        Hashable description of everything else the value depends on.
+    compute : Callable
+        Function with no arguments that calculates the value.
+
+    Returns
+    -------
+    value
+        Result of compute().
+
+    """
+    key = id(data)
+    entry = _background_cache.get(key)
+    if entry is None or entry[0]() is not data:
+        try:
+            ref = weakref.ref(data, lambda _, key=key: _background_cache.pop(key, None))
+        except TypeError:
+            return compute()
+        entry = (ref, {})
+        _background_cache[key] = entry
+
+    values = entry[1]
+    if params not in values:
+        values[params] = compute()
+    return values[params]
+
+def clear_background_cache():
+    """Empties the cache of background statistics used by findnoise and Snipper."""
+    _background_cache.clear()
 
 def removenoise(snipsIn, noiseindex):
     """
@@ -633,10 +1127,6 @@ def resample_snips(snips, factor=0.1):
         n_bins = len(snips[0])
         out_bins = int(n_bins * factor)
 
-        snips_out = []
-        for snip in snips:
-            snips_out.append(np.mean(np.reshape(snip, (out_bins, -1)), axis=1))
-    
-        return snips_out
+        return list(bin_snips(np.asarray(snips, dtype=np.float64), bins=out_bins))
     else:
         return []
\ No newline at end of file